@@ -4,6 +4,9 @@ import matplotlib.patches as patches
 import matplotlib.pyplot as plt
 import matplotlib.lines as mlines
 import utils2d
+import model
+import integrate
+import sweep
 
 # Folder Setting
 foldername = './Diagrams/'
@@ -11,77 +14,50 @@ if not os.path.exists(foldername):
     os.makedirs(foldername)
 
 # Define Parameters
-L = 1.5          # Luminosity
-ab = 0.25        # Black Daisy Albedo
-aw = 0.75        # White Daisy Albedo
-ag = 0.5         # Ground Albedo
-R = 0.2          # Insulation Constant
-S = 917          # Solar Constant
-sigma = 5.67e-8  # Stefan-Boltzmann Constant
-Ti = 22.5        # Ideal Growth Temperature
-gamma = 0.3      # Death Rate
+world = model.World2(
+    L=1.5,          # Luminosity
+    ab=0.25,        # Black Daisy Albedo
+    aw=0.75,        # White Daisy Albedo
+    ag=0.5,         # Ground Albedo
+    R=0.2,          # Insulation Constant
+    S=917,          # Solar Constant
+    sigma=5.67e-8,  # Stefan-Boltzmann Constant
+    Ti=22.5,        # Ideal Growth Temperature
+    gamma=0.3,      # Death Rate
+)
 
 # dA/dt of Black Daisy
 def vb(Ab, Aw):
-    ap = Aw * aw + Ab * ab + (1 - Aw - Ab) * ag                 # Planet Albedo
-    Te = (L * (S / sigma) * (1 - ap)) ** 0.25                   # Planet Temp
-    Tb = (R * L * (S / sigma) * (ap - ab) + (Te ** 4)) ** 0.25  # Black Daisy Temp
-    bb = 1 - (0.003265 * ((273.15 + Ti) - Tb) ** 2)             # Black Daisy Growth Rate
-    return Ab * ((1 - Ab - Aw) * bb - gamma)
+    return model.vb(Ab, Aw, world)
 
 # dA/dt of White Daisy
 def vw(Ab, Aw):
-    ap = Aw * aw + Ab * ab + (1 - Aw - Ab) * ag                 # Planet Albedo
-    Te = (L * (S / sigma) * (1 - ap)) ** 0.25                   # Planet Temp
-    Tw = (R * L * (S / sigma) * (ap - aw) + (Te ** 4)) ** 0.25  # White Daisy Temp
-    bw = 1 - (0.003265 * ((273.15 + Ti) - Tw) ** 2)             # White Daisy Growth Rate
-    return Aw * ((1 - Aw - Ab) * bw - gamma)
+    return model.vw(Ab, Aw, world)
+
+# Jacobian of (dAb/dt, dAw/dt), lets utils2d.equilibrium use Newton's method
+def jacobian(Ab, Aw):
+    return model.jacobian2d(Ab, Aw, world)
 
 def tip2d(save=True):
     dt = 0.01
     fig, ax = plt.subplots(1, 2, figsize=(10, 4))
 
-    time = np.arange(0, 20, dt)
-    black_areas, white_areas = np.zeros(len(time)), np.zeros(len(time))
-    Ab, Aw = 0.58, 0.41  # initial areas to choose
-    ax[0].set_title(
-        r'$A_b^{(j=0)}=$' + '${:.02f}$'.format(Ab) + \
-        r', $A_w^{(j=0)}=$' + '${:.02f}$'.format(Aw)
-    )
-    ax[0].grid()
-    for i in range(len(time)):
-        black_areas[i] = Ab
-        white_areas[i] = Aw
-        Ab += vb(Ab, Aw) * dt
-        Aw += vw(Ab, Aw) * dt
-    lineb, linew = utils2d.plot_time_iteration(time, black_areas, white_areas, ax=ax[0])
-    lineb.set_color('#000000')
-    linew.set_color('#000000')
-    lineb.set_marker('')
-    linew.set_marker('')
-    lineb.set_linestyle('-')
-    linew.set_linestyle('--')
+    Ab0s, Aw0s = np.array([0.58, 0.33]), np.array([0.41, 0.65])  # initial areas to choose
+    time, black_areas, white_areas = integrate.euler2d(vb, vw, Ab0s, Aw0s, dt=dt, tmax=20)
+    for j in range(len(Ab0s)):
+        ax[j].set_title(
+            r'$A_b^{(j=0)}=$' + '${:.02f}$'.format(Ab0s[j]) + \
+            r', $A_w^{(j=0)}=$' + '${:.02f}$'.format(Aw0s[j])
+        )
+        ax[j].grid()
+        lineb, linew = utils2d.plot_time_iteration(time, black_areas[:, j], white_areas[:, j], ax=ax[j])
+        lineb.set_color('#000000')
+        linew.set_color('#000000')
+        lineb.set_marker('')
+        linew.set_marker('')
+        lineb.set_linestyle('-')
+        linew.set_linestyle('--')
 
-    time = np.arange(0, 20, dt)
-    black_areas, white_areas = np.zeros(len(time)), np.zeros(len(time))
-    Ab, Aw = 0.33, 0.65  # initial areas to choose
-    ax[1].set_title(
-        r'$A_b^{(j=0)}=$' + '${:.02f}$'.format(Ab) + \
-        r', $A_w^{(j=0)}=$' + '${:.02f}$'.format(Aw)
-    )
-    ax[1].grid()
-    for i in range(len(time)):
-        black_areas[i] = Ab
-        white_areas[i] = Aw
-        Ab += vb(Ab, Aw) * dt
-        Aw += vw(Ab, Aw) * dt
-    lineb, linew = utils2d.plot_time_iteration(time, black_areas, white_areas, ax=ax[1])
-    lineb.set_color('#000000')
-    linew.set_color('#000000')
-    lineb.set_marker('')
-    linew.set_marker('')
-    lineb.set_linestyle('-')
-    linew.set_linestyle('--')
     ax[0].legend(handles=[
         mlines.Line2D([], [], color='k', linestyle='-', label='Black Daisy Area'),
         mlines.Line2D([], [], color='k', linestyle='--', label='White Daisy Area')
@@ -99,8 +75,8 @@ def tip2d(save=True):
 def ssp2d(save=True):
     fig, ax = plt.subplots(figsize=(6, 6))
     Aws, Abs = np.mgrid[0:1:100j, 0:1:100j] 
-    vbs, vws = vb(Abs, Aws), vw(Abs, Aws)  # find dA/dt at every possible value of Ab and Aw
-    fixed_points = utils2d.equilibrium(vb, vw)
+    vbs, vws = model.rates2d(Abs, Aws, world)  # find dA/dt at every possible value of Ab and Aw
+    fixed_points = utils2d.equilibrium(vb, vw, jacobian=jacobian)
     print(fixed_points)
     l = utils2d.plot_state_space(Abs, Aws, vbs, vws, fixed_points, ax=ax)
     l[0].lines.set_color('#000000')
@@ -130,13 +106,9 @@ def ssp2d(save=True):
         plt.show()
 
 def bif2d(save=True):
-    global L
     fig, ax = plt.subplots(1, 2, figsize=(10, 4), subplot_kw=dict(projection="3d"))
     Luminosities = np.arange(0.5, 2.1, 0.02)
-    fixed_points_list = []
-    for l in Luminosities:
-        L = l
-        fixed_points_list.append(utils2d.equilibrium(vb, vw, nTestvec=6))
+    fixed_points_list = sweep.equilibria2d(world, Luminosities, nTestvec=6)
     _l0 = utils2d.plot_bifurcation(Luminosities, fixed_points_list, ax=ax[0])
     _l1 = utils2d.plot_bifurcation(Luminosities, fixed_points_list, ax=ax[1])
     ls = [_l0, _l1]
@@ -166,6 +138,7 @@ def bif2d(save=True):
     else:
         plt.show()
 
-tip2d()
-ssp2d()
-bif2d()
+if __name__ == "__main__":  # sweeps run on a process pool
+    tip2d()
+    ssp2d()
+    bif2d()
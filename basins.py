@@ -0,0 +1,95 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import numpy as np
+import cache
+import equilibria
+import integrate
+import model
+import sweep
+
+# Basins of attraction of the Two-Daisy World. Every cell of an n-by-n grid over
+# the simplex Ab + Aw <= 1 starts a trajectory at its centre; the trajectories are
+# integrated together in chunks of chunksize cells (so memory does not grow with
+# n), each with its own adaptive Dormand-Prince step size, and a cell drops out
+# of its chunk as soon as it comes within radius of a stable fixed point.
+#
+# Returns (ab, aw, labels, times, attractors): the cell centres along each axis,
+# labels[i, j] for the cell at (ab[j], aw[i]) (rows are Aw, as with np.mgrid),
+# the time the cell took to converge, and the stable fixed points as an array of
+# (Ab, Aw) rows. A label is the index of the attractor reached, OUTSIDE for
+# cells beyond the simplex, or UNCONVERGED if tmax passed first (e.g. on the
+# stable manifold of a saddle). Chunks run on a process pool through sweep.run;
+# maps are kept in the on-disk cache, since large ones take a while.
+
+OUTSIDE, UNCONVERGED = -1, -2
+
+@cache.persistent(ignore=("workers", "chunksize", "progress"))
+def basins2d(world, n=200, tmax=500., radius=1e-3, rtol=1e-6, atol=1e-9, h0=0.1, maxSteps=10000,
+             nTestvec=21, chunksize=2 ** 16, workers=None, progress=None):
+    fixedPoints = equilibria.fixedPoints2d(world, nTestvec=nTestvec)
+    attractors = np.array([p for p, stable in fixedPoints.items() if stable], dtype=float).reshape(-1, 2)
+    ab = aw = (np.arange(n) + 0.5) / n
+    Aws, Abs = np.meshgrid(aw, ab, indexing="ij")
+    inside = np.flatnonzero(Abs + Aws <= 1)
+    settings = (tmax, radius, rtol, atol, h0, maxSteps)
+    chunks = [(world, attractors, Abs.flat[inside[i:i + chunksize]], Aws.flat[inside[i:i + chunksize]], settings)
+              for i in range(0, len(inside), chunksize)]
+    results = sweep.run(_basinChunk, chunks, workers=workers, chunksize=1, progress=progress)
+    labels = np.full(n * n, OUTSIDE, dtype=np.int16)
+    times = np.full(n * n, np.nan)
+    if results:
+        labels[inside] = np.concatenate([r[0] for r in results])
+        times[inside] = np.concatenate([r[1] for r in results])
+    return ab, aw, labels.reshape(n, n), times.reshape(n, n), attractors
+
+def _basinChunk(chunk):
+    world, attractors, Ab, Aw, (tmax, radius, rtol, atol, h0, maxSteps) = chunk
+    def f(y):
+        return np.array(model.rates2d(y[0], y[1], world))
+    y = np.array([Ab, Aw])
+    labels = np.full(len(Ab), UNCONVERGED, dtype=np.int16)
+    times = np.full(len(Ab), np.nan)
+    cells = np.arange(len(Ab))  # the cells still being integrated
+    t = np.zeros(len(Ab))
+    h = np.full(len(Ab), h0)
+    k = f(y)
+    for _ in range(maxSteps):
+        if len(attractors):
+            distance = np.hypot(y[0][:, None] - attractors[:, 0], y[1][:, None] - attractors[:, 1])
+            nearest = np.argmin(distance, axis=1)
+            arrived = distance[np.arange(len(cells)), nearest] < radius
+            labels[cells[arrived]] = nearest[arrived]
+            times[cells[arrived]] = t[arrived]
+        else:
+            arrived = np.zeros(len(cells), dtype=bool)
+        keep = ~arrived & (t < tmax)
+        cells, y, k, t, h = cells[keep], y[:, keep], k[:, keep], t[keep], h[keep]
+        if not len(cells):
+            break
+        h = np.minimum(h, tmax - t)
+        with np.errstate(invalid="ignore", over="ignore"):
+            yNew, kNew, err = integrate.step54(f, y, k, h)
+            scale = atol + rtol * np.maximum(np.abs(y), np.abs(yNew))
+            error = np.max(np.abs(err) / scale, axis=0)
+        accept = error <= 1
+        y[:, accept], k[:, accept] = yNew[:, accept], kNew[:, accept]
+        t[accept] += h[accept]
+        with np.errstate(divide="ignore"):
+            h *= np.where(np.isfinite(error), np.clip(0.9 * error ** -0.2, 0.2, 5), 0.2)
+    return labels, times
+
+# RGBA image of a basin map for imshow(origin="lower"), one pastel colour per
+# attractor; cells outside the simplex or unconverged are transparent
+PALETTE = [(1.0, 0.7, 0.88), (1.0, 0.88, 0.56), (0.69, 0.78, 1.0), (0.69, 1.0, 0.69)]
+
+def image(labels, alpha=0.35):
+    rgba = np.zeros(labels.shape + (4,))
+    for i in range(labels.max() + 1):
+        rgba[labels == i] = PALETTE[i % len(PALETTE)] + (alpha,)
+    return rgba
+
+def extent(ab, aw):  # (left, right, bottom, top) of the cells, for imshow
+    d = 1 / len(ab)
+    return ab[0] - d / 2, ab[-1] + d / 2, aw[0] - d / 2, aw[-1] + d / 2
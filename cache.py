@@ -0,0 +1,311 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+import numpy as np
+
+# Bounded in-memory memoization. Unlike functools.lru_cache, entries are also
+# evicted once their estimated size passes maxbytes, and the counters tell how
+# well a cache is doing. Keys must be hashable, e.g. a model.World1 record plus
+# the solver settings; a cache may be shared between threads.
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "size", "nbytes", "maxsize", "maxbytes"])
+
+class LRUCache:
+    def __init__(self, maxsize=4096, maxbytes=64 * 2 ** 20):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.entries = OrderedDict()  # key -> (value, nbytes), least recently used first
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def lookup(self, key, default=None):  # counts a hit or a miss
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+            return default
+
+    def store(self, key, value):
+        nbytes = sizeof(value)
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[1]
+            if nbytes > self.maxbytes:  # would evict everything else and still not fit
+                return
+            self.entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while (len(self.entries) > self.maxsize) or (self.nbytes > self.maxbytes):
+                self.nbytes -= self.entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self.entries), self.nbytes, self.maxsize, self.maxbytes)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+# Decorator: memoize func in an LRUCache keyed on all of its arguments, with the
+# defaults filled in so that f(w) and f(w, tol=<default>) share an entry. The
+# wrapper exposes .cache, .key(*args, **kwargs), .cache_info() and .cache_clear().
+# Cached values are returned as they are, so callers must not modify them, unless
+# copy (e.g. dict) is given to hand out a copy of the cached value instead.
+def lru(maxsize=4096, maxbytes=64 * 2 ** 20, copy=None):
+    def decorator(func):
+        signature = inspect.signature(func)
+        cache = LRUCache(maxsize, maxbytes)
+        missing = object()
+        def key(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple((name, _hashable(value)) for name, value in bound.arguments.items())
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs)
+            value = cache.lookup(k, missing)
+            if value is missing:
+                value = func(*args, **kwargs)
+                cache.store(k, value)
+            return value if copy is None else copy(value)
+        wrapper.cache = cache
+        wrapper.key = key
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+# Content-addressed results on disk, shared between processes and sessions. An
+# entry is a directory named by the SHA-256 of its key, holding the arrays of
+# the value as .npy files (memory-mapped when read) and structure.json, which
+# describes how to rebuild the value from them: nested tuples, lists and dicts of
+# arrays, masked arrays and plain scalars. Entries are written to a temporary
+# directory and renamed into place, so readers never see a partial entry. When
+# the entries exceed maxbytes, the least recently read ones are deleted. I/O
+# errors, and values with no on-disk form, only ever turn into misses: a
+# read-only or full disk disables nothing but the caching itself.
+
+DiskInfo = namedtuple("DiskInfo", ["hits", "misses", "size", "nbytes", "maxbytes", "directory"])
+
+class DiskCache:
+    def __init__(self, directory, maxbytes=256 * 2 ** 20):
+        self.directory = directory  # None disables the cache
+        self.maxbytes = maxbytes
+        self.hits = self.misses = 0
+
+    def lookup(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, "structure.json")) as f:
+                structure = json.load(f)
+            value = _decode(structure, lambda name: np.load(os.path.join(path, name), mmap_mode="r"))
+            os.utime(os.path.join(path, "structure.json"))  # most recently used
+        except (OSError, ValueError, KeyError, TypeError):
+            if (path is not None) and os.path.isdir(path):  # damaged or from an older format
+                shutil.rmtree(path, ignore_errors=True)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        path = self._path(key)
+        if path is None:
+            return
+        temporary = None
+        try:
+            arrays = []
+            structure = _encode(value, arrays)
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+            for i, array in enumerate(arrays):
+                np.save(os.path.join(temporary, "{}.npy".format(i)), array, allow_pickle=False)
+            with open(os.path.join(temporary, "structure.json"), "w") as f:
+                json.dump(structure, f)
+            try:
+                os.rename(temporary, path)
+            except OSError:  # another process stored the same result first
+                shutil.rmtree(temporary, ignore_errors=True)
+            self.prune()
+        except (OSError, TypeError, ValueError):  # unwritable, or a value with no on-disk form (e.g. object arrays): not stored
+            if temporary is not None:
+                shutil.rmtree(temporary, ignore_errors=True)
+
+    def prune(self):  # delete the least recently used entries until the total fits in maxbytes
+        entries = []
+        for entry in self._entries():
+            try:
+                files = [os.path.join(entry, name) for name in os.listdir(entry)]
+                nbytes = sum(os.path.getsize(f) for f in files)
+                entries.append((os.path.getmtime(os.path.join(entry, "structure.json")), nbytes, entry))
+            except OSError:
+                continue
+        total = sum(nbytes for _, nbytes, _ in entries)
+        for _, nbytes, entry in sorted(entries):
+            if total <= self.maxbytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= nbytes
+
+    def info(self):
+        sizes = []
+        for entry in self._entries():
+            try:
+                sizes.append(sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry)))
+            except OSError:
+                continue
+        return DiskInfo(self.hits, self.misses, len(sizes), sum(sizes), self.maxbytes, self.directory)
+
+    def clear(self):
+        for entry in self._entries():
+            shutil.rmtree(entry, ignore_errors=True)
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return None if self.directory is None else os.path.join(self.directory, key)
+
+    def _entries(self):
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if not name.startswith(".")]
+
+# The shared on-disk cache: $DAISYWORLD_CACHE, or ~/.cache/daisyworld; set
+# DAISYWORLD_CACHE to an empty string to turn it off.
+disk = DiskCache(os.environ.get("DAISYWORLD_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "daisyworld")) or None)
+
+# Decorator: keep the results of func in the on-disk cache, keyed on the name of
+# func, version, its arguments (defaults filled in, those named in ignore left
+# out, records and arrays hashed by content) and a digest of the source of func's
+# module and of SOURCES (the numerical modules it builds on, and this one for the
+# on-disk format), so editing the code invalidates its entries. Bump version when a change elsewhere alters the results. The
+# arguments must describe the result completely, e.g. a model.World1 record and
+# solver settings, never a callable. Arrays in a result that comes from disk are
+# read-only memory maps.
+SOURCES = ("model.py", "equilibria.py", "integrate.py", "sweep.py", "continuation.py", "cache.py")
+
+def persistent(version=0, ignore=()):
+    def decorator(func):
+        signature = inspect.signature(func)
+        path = sys.modules[func.__module__].__file__
+        name = "{}.{}".format(os.path.splitext(os.path.basename(path))[0], func.__qualname__)
+        sources = [path] + [os.path.join(os.path.dirname(os.path.abspath(__file__)), s) for s in SOURCES]
+        code = []  # digest of the sources, read on the first call rather than at import
+        missing = object()
+        def key(*args, **kwargs):
+            if not code:
+                code.append(_digest(sources))
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = [(n, v) for n, v in bound.arguments.items() if n not in ignore]
+            return hashlib.sha256(repr(_canonical((name, version, code[0], arguments))).encode()).hexdigest()
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs)
+            value = disk.lookup(k, missing)
+            if value is missing:
+                value = func(*args, **kwargs)
+                disk.store(k, value)
+            return value
+        wrapper.key = key
+        return wrapper
+    return decorator
+
+def _digest(paths):  # of the files' contents; a file that cannot be read counts as empty
+    h = hashlib.sha256()
+    for path in dict.fromkeys(os.path.abspath(p) for p in paths):
+        try:
+            with open(path, "rb") as f:
+                h.update(f.read())
+        except OSError:
+            pass
+        h.update(b"\0")
+    return h.hexdigest()
+
+# Estimated memory held by a value, containers recursively (numpy arrays that own
+# their data already count their buffer in sys.getsizeof)
+def sizeof(value):
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+def _hashable(value):  # kwargs dicts (e.g. forwarded solver settings) become sorted tuples
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+def _canonical(value):  # a repr that depends only on content: numpy scalars as Python ones, arrays by digest
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.dtype.str, value.shape, hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple) and hasattr(value, "_fields"):  # namedtuple records, e.g. model.World1
+        return (type(value).__name__, tuple(zip(value._fields, map(_canonical, value))))
+    if isinstance(value, (tuple, list)):
+        return tuple(_canonical(v) for v in value)
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((repr(_canonical(k)), _canonical(v)) for k, v in value.items())))
+    return value
+
+def _encode(value, arrays):  # JSON description of value; the arrays it refers to are appended to arrays
+    if isinstance(value, np.ma.MaskedArray):
+        return {"masked": [_encode(np.ma.getdata(value), arrays), _encode(np.ma.getmaskarray(value), arrays)]}
+    if isinstance(value, np.ndarray):
+        arrays.append(np.ascontiguousarray(value))
+        return {"array": "{}.npy".format(len(arrays) - 1)}
+    if isinstance(value, np.generic):
+        return {"scalar": value.item()}
+    if isinstance(value, list) and len(value) > 1 and all(isinstance(v, np.ndarray) and not isinstance(v, np.ma.MaskedArray)
+                                                          and v.ndim >= 1 and v.shape[1:] == value[0].shape[1:]
+                                                          and v.dtype == value[0].dtype for v in value):
+        arrays.append(np.concatenate(value))  # ragged list of arrays, e.g. streamlines, as one file
+        return {"ragged": "{}.npy".format(len(arrays) - 1), "lengths": [len(v) for v in value]}
+    if isinstance(value, tuple):
+        return {"tuple": [_encode(v, arrays) for v in value]}
+    if isinstance(value, list):
+        return {"list": [_encode(v, arrays) for v in value]}
+    if isinstance(value, dict):
+        return {"dict": [[_encode(k, arrays), _encode(v, arrays)] for k, v in value.items()]}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return {"scalar": value}
+    raise TypeError("Cannot store {} on disk".format(type(value).__name__))
+
+def _decode(structure, load):
+    kind, content = next(iter(structure.items()))
+    if kind == "masked":
+        return np.ma.array(_decode(content[0], load), mask=_decode(content[1], load))
+    if kind == "array":
+        return load(content)
+    if kind == "ragged":
+        return np.split(load(content), np.cumsum(structure["lengths"])[:-1])
+    if kind == "tuple":
+        return tuple(_decode(v, load) for v in content)
+    if kind == "list":
+        return [_decode(v, load) for v in content]
+    if kind == "dict":
+        return {_decode(k, load): _decode(v, load) for k, v in content}
+    if kind == "scalar":
+        return content
+    raise ValueError("Unknown entry in structure.json: {}".format(kind))
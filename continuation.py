@@ -0,0 +1,408 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import numpy as np
+import cache
+import equilibria
+import model
+
+# Pseudo-arclength continuation of equilibrium branches in luminosity.
+# Branches are seeded from the equilibria found at nSeeds luminosities, traced
+# in both directions with tangent predictor / Newton corrector steps whose size
+# adapts to how hard the corrector worked, and followed around folds.
+# world is a model.World1 / model.World2 record; its own L is ignored.
+# Returns a list of branches (Ls, As, stable) in 1D or (Ls, Abs, Aws, stable) in 2D.
+# Branches and folds are kept in the on-disk cache (see cache.persistent).
+
+@cache.persistent()
+def branches1d(world, Lmin, Lmax, nSeeds=5, ds=0.01, dsmin=1e-6, dsmax=0.05, maxSteps=5000, tol=1e-10):
+    def F(y):
+        return np.array([model.v(y[0], world._replace(L=y[1]))])
+    def DF(y):
+        return np.array([model.derivatives1d(y[0], world._replace(L=y[1]))])
+    def margin(y):
+        return np.array([y[0], 1 - y[0], y[1] - Lmin, Lmax - y[1]])
+    seeds = []
+    for L in np.linspace(Lmin, Lmax, num=nSeeds):
+        w = world._replace(L=L)
+        for A in equilibria.fixedPoints1d(w).keys():
+            seeds.append(np.array([A, L]))
+    branches = []
+    for y in _branches(F, DF, seeds, margin, ds, dsmin, dsmax, maxSteps, tol):
+        stable = model.derivatives1d(y[:, 0], world._replace(L=y[:, 1]))[0] < 0
+        branches.append((y[:, 1], y[:, 0], stable))
+    return branches
+
+@cache.persistent()
+def branches2d(world, Lmin, Lmax, nSeeds=5, nTestvec=11, ds=0.01, dsmin=1e-6, dsmax=0.05, maxSteps=5000, tol=1e-10):
+    def F(y):
+        w = world._replace(L=y[2])
+        return np.array([model.vb(y[0], y[1], w), model.vw(y[0], y[1], w)])
+    def DF(y):
+        w = world._replace(L=y[2])
+        j00, j01, j10, j11 = model.jacobian2d(y[0], y[1], w)
+        dvbdL, dvwdL = model.dvdL2d(y[0], y[1], w)
+        return np.array([[j00, j01, dvbdL], [j10, j11, dvwdL]])
+    def margin(y):
+        return np.array([y[0], y[1], 1 - y[0] - y[1], y[2] - Lmin, Lmax - y[2]])
+    seeds = []
+    for L in np.linspace(Lmin, Lmax, num=nSeeds):
+        w = world._replace(L=L)
+        for Ab, Aw in equilibria.fixedPoints2d(w, nTestvec=nTestvec).keys():
+            seeds.append(np.array([Ab, Aw, L]))
+    branches = []
+    for y in _branches(F, DF, seeds, margin, ds, dsmin, dsmax, maxSteps, tol):
+        j00, j01, j10, j11 = model.jacobian2d(y[:, 0], y[:, 1], world._replace(L=y[:, 2]))
+        stable = (j00 + j11 < 0) & (j00 * j11 - j01 * j10 > 0)
+        branches.append((y[:, 2], y[:, 0], y[:, 1], stable))
+    return branches
+
+# Points where an equilibrium changes stability through a zero eigenvalue: the
+# saddle-nodes (folds) at which the system tips, and the transcritical points at
+# which a branch meets the bare-ground edge. They solve v = 0 together with
+# dv/dA = 0 (1D) or det J = 0 (2D); Newton's method on that extended system,
+# started where the condition changes sign along a traced branch, converges to
+# machine precision. Returns a list of (L, A) or (L, Ab, Aw) sorted by L.
+
+@cache.persistent()
+def folds1d(world, Lmin, Lmax, tol=1e-14, **kwargs):
+    def G(y):
+        w = world._replace(L=y[1])
+        return np.array([model.v(y[0], w), model.derivatives1d(y[0], w)[0]])
+    guesses = []
+    for L, A, _ in branches1d(world, Lmin, Lmax, **kwargs):
+        condition = model.derivatives1d(A, world._replace(L=L))[0]
+        for i in _signChanges(condition):
+            guesses.append(np.array([A[i], L[i]]))
+    folds = _folds(G, guesses, tol)
+    return sorted((L, A) for A, L in folds)
+
+@cache.persistent()
+def folds2d(world, Lmin, Lmax, tol=1e-14, **kwargs):
+    def G(y):
+        w = world._replace(L=y[2])
+        j00, j01, j10, j11 = model.jacobian2d(y[0], y[1], w)
+        return np.array([model.vb(y[0], y[1], w), model.vw(y[0], y[1], w), j00 * j11 - j01 * j10])
+    guesses = []
+    for L, Ab, Aw, _ in branches2d(world, Lmin, Lmax, **kwargs):
+        j00, j01, j10, j11 = model.jacobian2d(Ab, Aw, world._replace(L=L))
+        for i in _signChanges(j00 * j11 - j01 * j10):
+            guesses.append(np.array([Ab[i], Aw[i], L[i]]))
+    folds = _folds(G, guesses, tol)
+    return sorted((L, Ab, Aw) for Ab, Aw, L in folds)
+
+# Codimension-two continuation: the folds and transcritical points that folds1d
+# / folds2d find, continued in L together with a second parameter p of the
+# record (e.g. "gamma", "R" or an albedo) over plim. A fold solves v = 0 for the
+# species present with det J = 0 over them; a transcritical point keeps one more
+# species absent and solves v = 0 for the others with a zero growth rate of the
+# absent one (J[k, k] = 0), which is where it can invade. Curves are seeded from
+# the points found at nSeeds values of p inside plim and traced with the pseudo-arclength
+# steps of the branches. Returns a list of (Ls, ps, As, kind) in 1D or
+# (Ls, ps, Abs, Aws, kind) in 2D, with kind FOLD or TRANSCRITICAL; for the One-Daisy
+# World the bistable region lies between the fold and the transcritical curve.
+
+FOLD, TRANSCRITICAL = "fold", "transcritical"
+
+@cache.persistent()
+def foldCurves1d(world, p, plim, Lmin, Lmax, nSeeds=5, ds=0.01, dsmin=1e-6, dsmax=0.05, maxSteps=5000, tol=1e-10):
+    seeds = _codim2Seeds(folds1d, world, p, plim, Lmin, Lmax, nSeeds)
+    curves = _codim2Curves(_system1d(world, p), 1, plim, Lmin, Lmax, seeds, ds, dsmin, dsmax, maxSteps, tol)
+    return [(L, ps, x[:, 0], FOLD if k is None else TRANSCRITICAL) for _, k, x, L, ps in curves]
+
+@cache.persistent()
+def foldCurves2d(world, p, plim, Lmin, Lmax, nSeeds=5, ds=0.01, dsmin=1e-6, dsmax=0.05, maxSteps=5000, tol=1e-10):
+    seeds = _codim2Seeds(folds2d, world, p, plim, Lmin, Lmax, nSeeds)
+    curves = _codim2Curves(_system2d(world, p), 2, plim, Lmin, Lmax, seeds, ds, dsmin, dsmax, maxSteps, tol)
+    return [(L, ps, x[:, 0], x[:, 1], FOLD if k is None else TRANSCRITICAL) for _, k, x, L, ps in curves]
+
+# The codimension-two points on those curves, at which a bistable region ends:
+# CUSP where two folds merge (the fold curve turns back in the (L, p) plane, as
+# the derivative of det J along its null vector vanishes), and DEGENERATE where
+# a fold curve runs into a transcritical one on the edge where a species is
+# absent (the branch born at the transcritical point turns around on the spot).
+# They are bracketed along the traced curves and polished by Newton's method on
+# the extended systems. Returns a list of (L, p, A, kind) or (L, p, Ab, Aw, kind)
+# sorted by L.
+
+CUSP, DEGENERATE = "cusp", "degenerate transcritical"
+
+@cache.persistent()
+def cusps1d(world, p, plim, Lmin, Lmax, tol=1e-12, **kwargs):
+    curves = [(np.column_stack([A]), L, ps) for L, ps, A, _ in foldCurves1d(world, p, plim, Lmin, Lmax, **kwargs)]
+    points = _codim2Points(_system1d(world, p), 1, curves, plim, Lmin, Lmax, tol)
+    return sorted((L, pv, A, kind) for (A, L, pv), kind in points)
+
+@cache.persistent()
+def cusps2d(world, p, plim, Lmin, Lmax, tol=1e-12, **kwargs):
+    curves = [(np.column_stack([Ab, Aw]), L, ps) for L, ps, Ab, Aw, _ in foldCurves2d(world, p, plim, Lmin, Lmax, **kwargs)]
+    points = _codim2Points(_system2d(world, p), 2, curves, plim, Lmin, Lmax, tol)
+    return sorted((L, pv, Ab, Aw, kind) for (Ab, Aw, L, pv), kind in points)
+
+def _system1d(world, p):  # rates and Jacobian of the state x at (L, p), as arrays
+    def rates(x, L, pv):
+        return np.array([model.v(x[0], world._replace(L=L, **{p: pv}))])
+    def jacobian(x, L, pv):
+        return np.array([[model.derivatives1d(x[0], world._replace(L=L, **{p: pv}))[0]]])
+    return rates, jacobian
+
+def _system2d(world, p):
+    def rates(x, L, pv):
+        w = world._replace(L=L, **{p: pv})
+        return np.array([model.vb(x[0], x[1], w), model.vw(x[0], x[1], w)])
+    def jacobian(x, L, pv):
+        return np.array(model.jacobian2d(x[0], x[1], world._replace(L=L, **{p: pv}))).reshape(2, 2)
+    return rates, jacobian
+
+def _codim2Seeds(folds, world, p, plim, Lmin, Lmax, nSeeds):  # (x, L, p) of the folds at nSeeds values of p
+    if (p == "L") or (p not in world._fields):
+        raise ValueError("Need a parameter of {} other than L, not {}".format(type(world).__name__, p))
+    seeds = []
+    for pv in plim[0] + (plim[1] - plim[0]) * (np.arange(nSeeds) + 0.5) / nSeeds:  # the ends are often degenerate, e.g. R = 0
+        for f in folds(world._replace(**{p: pv}), Lmin, Lmax):
+            seeds.append((np.array(f[1:]), f[0], pv))
+    return seeds
+
+# The defining condition of a point x at (L, p): the species present (its face)
+# and, for a transcritical point, the absent species k whose growth rate
+# vanishes there, or k = None for a fold
+def _condition(system, x, L, pv):
+    _, jacobian = system
+    face = tuple(i for i in range(len(x)) if x[i] > 0)
+    J = jacobian(x, L, pv)
+    candidates = [(abs(J[k, k]), k) for k in range(len(x)) if k not in face]
+    if face:
+        candidates.append((abs(np.linalg.det(J[np.ix_(face, face)])), None))
+    return face, min(candidates, key=lambda c: c[0])[1]
+
+# Residual G(z) of a condition, with z = (x on the face, L, p), and state(z) = x
+def _conditionResidual(system, face, k, n):
+    rates, jacobian = system
+    face = list(face)
+    def state(z):
+        x = np.zeros(n)
+        x[face] = z[:len(face)]
+        return x
+    def G(z):
+        x = state(z)
+        J = jacobian(x, z[-2], z[-1])
+        critical = np.linalg.det(J[np.ix_(face, face)]) if k is None else J[k, k]
+        return np.append(rates(x, z[-2], z[-1])[face], critical)
+    return G, state
+
+# Trace the seeds in groups of the same condition; a list of (face, k, x, Ls, ps)
+def _codim2Curves(system, n, plim, Lmin, Lmax, seeds, ds, dsmin, dsmax, maxSteps, tol):
+    groups = {}
+    for x, L, pv in seeds:
+        face, k = _condition(system, x, L, pv)
+        groups.setdefault((face, k), []).append(np.append(x[list(face)], [L, pv]))
+    curves = []
+    for (face, k), zs in sorted(groups.items(), key=lambda g: (g[0][0], -1 if g[0][1] is None else g[0][1])):
+        G, state = _conditionResidual(system, face, k, n)
+        def margin(z):
+            return np.concatenate([z[:len(face)], [1 - state(z).sum(), z[-2] - Lmin, Lmax - z[-2], z[-1] - plim[0], plim[1] - z[-1]]])
+        with np.errstate(invalid="ignore"):  # trial steps may leave the physical region
+            traced = _branches(G, lambda z: _jacobian(G, z), zs, margin, ds, dsmin, dsmax, maxSteps, tol)
+        for z in traced:
+            curves.append((face, k, np.array([state(zi) for zi in z]), z[:, -2], z[:, -1]))
+    return curves
+
+# Codimension-two points on curves of (x, Ls, ps): reversals of a fold curve in
+# the (L, p) plane and sign changes of the degeneracy along a transcritical one.
+# Points are only kept inside the region and strictly inside their face, since
+# both conditions carry the areas of the species present as factors.
+def _codim2Points(system, n, curves, plim, Lmin, Lmax, tol, gtol=1e-8, mtol=1e-9):
+    points = []
+    for x, L, ps in curves:
+        if len(L) < 3:
+            continue
+        with np.errstate(invalid="ignore"):
+            found = _codim2Candidates(system, n, x, L, ps, tol, gtol)
+        for point, kind in found:
+            if (sum(point[:n]) > 1 + mtol) or not (Lmin - mtol <= point[n] <= Lmax + mtol) or not (plim[0] - mtol <= point[n + 1] <= plim[1] + mtol):
+                continue
+            if not any(max(abs(a - b) for a, b in zip(point, q)) < 1e-8 for q, _ in points):
+                points.append((point, kind))
+    return points
+
+def _codim2Candidates(system, n, x, L, ps, tol, gtol):  # the polished points along one curve, as ((x, L, p), kind)
+    points = []
+    middle = len(L) // 2
+    face, k = _condition(system, x[middle], L[middle], ps[middle])
+    G, state = _conditionResidual(system, face, k, n)
+    z = np.column_stack([x[:, list(face)], L, ps])
+    if k is None:
+        steps = np.diff(np.column_stack([L, ps]), axis=0)
+        guesses = z[np.flatnonzero(np.einsum("ij,ij->i", steps[:-1], steps[1:]) < 0) + 1]
+        found = [(_folds(_cuspResidual(G, state, system, face, g), [g], tol, gtol=gtol), CUSP) for g in guesses]
+    else:
+        H = _degenerateResidual(G, state, system, face, k)
+        condition = np.array([H(zi)[-1] for zi in z])
+        found = [(_folds(H, [z[i]], tol, gtol=gtol), DEGENERATE) for i in _signChanges(condition)]
+    for zs, kind in found:
+        for zi in zs:
+            zi = np.array(zi)
+            if np.any(zi[:len(face)] < 1e-9):  # on the edge of the face, where det M vanishes trivially
+                continue
+            points.append((tuple(float(c) for c in np.append(state(zi), zi[-2:])), kind))
+    return points
+
+# The fold residual G extended by the derivative of det J along its null vector q
+# (oriented as at z0), which vanishes at a cusp
+def _cuspResidual(G, state, system, face, z0, h=1e-5):
+    _, jacobian = system
+    face = list(face)
+    def null(z):
+        return np.linalg.svd(jacobian(state(z), z[-2], z[-1])[np.ix_(face, face)])[2][-1]
+    q0 = null(z0)
+    def H(z):
+        q = null(z)
+        e = np.zeros(len(z))
+        e[:len(face)] = h * (q if q @ q0 >= 0 else -q)
+        return np.append(G(z), (G(z + e)[-1] - G(z - e)[-1]) / (2 * h))
+    return H
+
+# The transcritical residual G extended by det M, where M is the Jacobian of the
+# growth rates per unit area (v_i / A_i) of the species present and of the absent
+# species k; it vanishes where a fold curve reaches the edge. On the edge, the
+# rows of the species present are those of J (scaled by their areas) and the row
+# of k follows from J[k, k] = g_k + A_k dg_k/dA_k.
+def _degenerateResidual(G, state, system, face, k, h=1e-5):
+    _, jacobian = system
+    columns = list(face) + [k]
+    def H(z):
+        x, L, pv = state(z), z[-2], z[-1]
+        row = []
+        for j in columns:
+            e = np.zeros(len(x))
+            e[j] = h
+            row.append((jacobian(x + e, L, pv)[k, k] - jacobian(x - e, L, pv)[k, k]) / (2 * h))
+        row[-1] /= 2
+        M = np.vstack([jacobian(x, L, pv)[np.ix_(list(face), columns)], row])
+        return np.append(G(z), np.linalg.det(M))
+    return H
+
+def _signChanges(x):
+    i = np.flatnonzero(np.sign(x[:-1]) != np.sign(x[1:]))
+    return np.where(np.abs(x[i]) < np.abs(x[i + 1]), i, i + 1)  # the closer end of each bracket
+
+# Newton's method with a central-difference Jacobian of the analytic residual G
+def _folds(G, guesses, tol, maxiter=50, gtol=1e-10):
+    folds = []
+    for y in guesses:
+        y = np.array(y, dtype=float)
+        for _ in range(maxiter):
+            g = G(y)
+            try:
+                dy = np.linalg.solve(_jacobian(G, y), -g)
+            except np.linalg.LinAlgError:
+                break
+            y = y + dy
+            if np.max(np.abs(dy)) <= tol * max(1, np.max(np.abs(y))):
+                break
+        if np.all(np.isfinite(y)) and np.max(np.abs(G(y))) < gtol:
+            y[np.abs(y) < 1e-12] = 0.  # the bare-ground edge is exact
+            if not any(np.max(np.abs(y - f)) < 1e-8 for f in folds):
+                folds.append(y)
+    return [tuple(float(c) for c in f) for f in folds]
+
+def _jacobian(G, y, h=1e-7):  # central differences, one column per coordinate of y
+    dG = np.empty((len(G(y)), len(y)))
+    for j in range(len(y)):
+        e = np.zeros(len(y))
+        e[j] = h * max(1, abs(y[j]))
+        dG[:, j] = (G(y + e) - G(y - e)) / (2 * e[j])
+    return dG
+
+# Trace every seed that does not already lie on a traced branch, in both directions.
+# F(y) is the residual of y = (state, L), DF(y) its Jacobian with the L column last,
+# margin(y) holds the linear constraints that are non-negative inside the region of interest.
+def _branches(F, DF, seeds, margin, ds, dsmin, dsmax, maxSteps, tol, mtol=1e-9):
+    branches = []
+    for y0 in seeds:
+        y0 = _polish(F, DF, y0, tol)
+        if (y0 is None) or (margin(y0).min() < -mtol) or any(_onBranch(y0, b) for b in branches):
+            continue
+        t0 = np.linalg.svd(DF(y0))[2][-1]  # null vector of DF is the tangent
+        if t0[-1] < 0:
+            t0 = -t0
+        back = _trace(F, DF, y0, -t0, margin, ds, dsmin, dsmax, maxSteps, tol, mtol)
+        forth = _trace(F, DF, y0, t0, margin, ds, dsmin, dsmax, maxSteps, tol, mtol)
+        y = np.array(back[::-1] + forth[1:])
+        if y[-1][-1] < y[0][-1]:
+            y = y[::-1]  # report branches with increasing L where possible
+        branches.append(y)
+    return branches
+
+def _trace(F, DF, y, t, margin, ds, dsmin, dsmax, maxSteps, tol, mtol, maxiter=8):
+    ys = [y]
+    while len(ys) < maxSteps:
+        h = ds
+        while True:
+            yc, nIter = _correct(F, DF, y + h * t, y, t, h, tol, maxiter)
+            if yc is not None:
+                break
+            h /= 2
+            if h < dsmin:
+                return ys
+        m0, m1 = margin(y), margin(yc)
+        out = m1 < -mtol
+        if out.any():  # left the region: stop on the first boundary crossed
+            ys.append(y + (yc - y) * np.min(m0[out] / (m0[out] - m1[out])))
+            return ys
+        ys.append(yc)
+        try:
+            tn = _tangent(DF(yc), t)
+        except np.linalg.LinAlgError:  # a singular point, e.g. where the branch meets another
+            return ys
+        y, t = yc, tn
+        if nIter <= 2:
+            ds = min(h * 1.5, dsmax)
+        elif nIter >= 5:
+            ds = max(h / 2, dsmin)
+        else:
+            ds = h
+    return ys
+
+# Newton corrector on F(y) = 0 together with the arclength condition t.(y - yPrev) = h
+def _correct(F, DF, y, yPrev, t, h, tol, maxiter):
+    for i in range(maxiter):
+        G = np.append(F(y), t @ (y - yPrev) - h)
+        DG = np.vstack([DF(y), t])
+        try:
+            dy = np.linalg.solve(DG, -G)
+        except np.linalg.LinAlgError:
+            return None, i
+        y = y + dy
+        if not np.all(np.isfinite(y)):
+            return None, i
+        if np.max(np.abs(dy)) < tol:
+            return y, i + 1
+    return None, maxiter
+
+def _tangent(DFy, t):
+    rhs = np.zeros(len(t))
+    rhs[-1] = 1
+    tn = np.linalg.solve(np.vstack([DFy, t]), rhs)
+    return tn / np.linalg.norm(tn)
+
+# Newton at fixed L, to turn a rounded equilibrium back into an exact one
+def _polish(F, DF, y, tol, maxiter=20):
+    y = np.array(y, dtype=float)
+    for _ in range(maxiter):
+        try:
+            dx = np.linalg.solve(DF(y)[:, :-1], -F(y))
+        except np.linalg.LinAlgError:
+            return y if np.max(np.abs(F(y))) < tol else None
+        y[:-1] += dx
+        if np.max(np.abs(dx)) < tol:
+            return y
+    return y if np.max(np.abs(F(y))) < np.sqrt(tol) else None
+
+def _onBranch(y, branch, tol=1e-4):
+    a, b = branch[:-1], branch[1:]
+    ab = b - a
+    s = np.clip(np.einsum("ij,ij->i", y - a, ab) / np.maximum(np.einsum("ij,ij->i", ab, ab), 1e-300), 0, 1)
+    distance = np.linalg.norm(a + s[:, None] * ab - y, axis=1)
+    return len(distance) > 0 and distance.min() < tol
@@ -5,41 +5,42 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import utils1d
+import model
+import integrate
+import continuation
 
 # Define Parameters
-L = 1.0          # Luminosity
-ai = 0.75        # Daisy Albedo
-ag = 0.5         # Ground Albedo
-R = 0.2          # Insulation Constant
-S = 917          # Solar Constant
-sigma = 5.67e-8  # Stefan-Boltzmann Constant
-Ti = 22.5        # Ideal Growth Temperature
-gamma = 0.3      # Death Rate
-
-# dA/dt Function
+world = model.World1(
+    L=1.0,          # Luminosity
+    ai=0.75,        # Daisy Albedo
+    ag=0.5,         # Ground Albedo
+    R=0.2,          # Insulation Constant
+    S=917,          # Solar Constant
+    sigma=5.67e-8,  # Stefan-Boltzmann Constant
+    Ti=22.5,        # Ideal Growth Temperature
+    gamma=0.3,      # Death Rate
+)
+
+# dA/dt Function (the equations are in model.py)
 def v(A):
-    ap = A * ai + (1 - A) * ag                                 # Planet Albedo
-    Te = (L * (S / sigma) * (1 - ap)) ** 0.25                  # Planet Temp
-    T = (R * L * (S / sigma) * (ap - ai) + (Te ** 4)) ** 0.25  # Black Daisy Temp
-    b = 1 - (0.003265 * ((273.15 + Ti) - T) ** 2)              # Black Daisy Growth Rate
-    return A * ((1 - A) * b - gamma)
+    return model.v(A, world)
+
+# d(dA/dt)/dA, lets utils1d.equilibrium classify the equilibria exactly
+def dvdA(A):
+    return model.derivatives1d(A, world)[0]
 
 # Time Iteration
 dt = 0.025
-time = np.arange(0, 10, dt)
-areas = np.zeros(len(time))
 A = 0.92  # initial area to choose
-for i in range(len(time)):
-    # Forward-Euler Trajectory
-    areas[i] = A
-    A += v(A) * dt
+time, areas = integrate.euler1d(v, A, dt=dt, tmax=10)  # Forward-Euler Trajectory
+# time, areas, _ = integrate.adaptive1d(v, A, times=np.arange(0, 10, dt))  # Adaptive Runge-Kutta, far fewer steps
 utils1d.plot_time_iteration(time, areas)
 plt.show()
 
 # State Space
 As = np.linspace(0, 1, num=101)
 vs = v(As)  # find dA/dt at every possible value of A
-fixed_points = utils1d.equilibrium(v)  # find equilibria
+fixed_points = utils1d.equilibrium(v, derivative=dvdA)  # find equilibria
 print(fixed_points)
 utils1d.plot_state_space(As, vs, fixed_points)
 plt.show()
@@ -51,10 +52,13 @@ _ = utils1d.plot_together(t_data, s_data, fixed_points)
 plt.show()
 
 # Bifurcation Plot with respect to Luminosity
-Luminosities = np.arange(0.5, 1.8, 0.02)
-fixed_points_list = []
-for l in Luminosities:
-    L = l
-    fixed_points_list.append(utils1d.equilibrium(v))
-utils1d.plot_bifurcation(Luminosities, fixed_points_list)
+branches = continuation.branches1d(world, 0.5, 1.8)  # trace equilibria as L changes
+utils1d.plot_branches(branches)
+plt.show()
+
+# Bistability Region with respect to Luminosity and Death Rate
+curves = continuation.foldCurves1d(world, "gamma", (0.05, 1.0), 0.3, 3.0)  # trace the tipping points as gamma changes
+cusps = continuation.cusps1d(world, "gamma", (0.05, 1.0), 0.3, 3.0)  # where the bistable region ends
+print(cusps)
+utils1d.plot_fold_curves(curves, cusps, "Death Rate ($\\gamma$)")
 plt.show()
@@ -0,0 +1,179 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import equilibria
+import integrate
+import model
+import regimes
+import sweep
+
+# Headless batch runs: trajectories, equilibria and luminosity sweeps, written to
+# .npz or .csv. Only NumPy (and SciPy for one-daisy equilibria) is imported, never
+# PyQt5 or matplotlib, so short jobs on compute nodes start quickly. Parameters
+# come from the model defaults, then a JSON file ({"L": 1.2, "gamma": 0.25}),
+# then the command line. A sweep can be split across a job array with --part.
+# A regime map classifies a plane of two parameters by the number of stable and
+# unstable fixed points, refining cells only along the regime boundaries.
+#
+#   python daisyworldCLI.py trajectory --model 2 --Ab0 0.3 --Aw0 0.4 -o run.npz
+#   python daisyworldCLI.py sweep --model 1 --Lmin 0.5 --Lmax 2.1 --dL 0.01 -o sweep.csv
+#   python daisyworldCLI.py sweep --part $SLURM_ARRAY_TASK_ID/16 -o part$SLURM_ARRAY_TASK_ID.npz
+#   python daisyworldCLI.py regimes --x L --xlim 0.5 1.8 --y gamma --ylim 0.1 0.6 --depth 6 -o regimes.csv
+
+WORLDS = {1: model.World1, 2: model.World2}
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    world = readWorld(args)
+    if args.command == "trajectory":
+        columns = trajectory(world, args)
+    elif args.command == "equilibria":
+        columns = fixedPoints(world, args)
+    elif args.command == "regimes":
+        columns = regimeMap(world, args)
+    else:
+        columns = luminositySweep(world, args)
+    write(args.output, columns, world)
+
+def parser():
+    p = argparse.ArgumentParser(description="Run Daisyworld without a display and save the arrays.")
+    sub = p.add_subparsers(dest="command", required=True)
+    commands = {
+        "trajectory": sub.add_parser("trajectory", help="areas over time from one or more initial conditions"),
+        "equilibria": sub.add_parser("equilibria", help="fixed points and their stability at one luminosity"),
+        "sweep": sub.add_parser("sweep", help="fixed points and their stability over a range of luminosities"),
+        "regimes": sub.add_parser("regimes", help="number of stable and unstable fixed points over a plane of two parameters"),
+    }
+    for c in commands.values():
+        c.add_argument("--model", type=int, choices=sorted(WORLDS), default=1, help="One-Daisy (1) or Two-Daisy (2) World")
+        c.add_argument("--params", help="JSON file of parameter values, overridden by the flags below")
+        for field in sorted(set(model.World1._fields) | set(model.World2._fields)):
+            c.add_argument("--" + field, type=float, help="model parameter " + field)
+        c.add_argument("-o", "--output", required=True, help="output file, .npz or .csv")
+    t = commands["trajectory"]
+    t.add_argument("--A0", type=float, nargs="+", default=[0.5], help="initial daisy areas (One-Daisy)")
+    t.add_argument("--Ab0", type=float, nargs="+", default=[0.3], help="initial black daisy areas (Two-Daisy)")
+    t.add_argument("--Aw0", type=float, nargs="+", default=[0.4], help="initial white daisy areas (Two-Daisy)")
+    t.add_argument("--tmax", type=float, default=10.)
+    t.add_argument("--dt", type=float, default=0.025, help="time step of the output (and of Forward-Euler)")
+    t.add_argument("--method", choices=["euler", "adaptive"], default="adaptive")
+    for c in (commands["equilibria"], commands["sweep"], commands["regimes"]):
+        c.add_argument("--nTestvec", type=int, help="grid of the equilibrium search (default: the solver's)")
+    s = commands["sweep"]
+    s.add_argument("--Lmin", type=float, default=0.5)
+    s.add_argument("--Lmax", type=float, default=1.8)
+    s.add_argument("--dL", type=float, default=0.025)
+    s.add_argument("--part", default="0/1", help="K/N: only the K-th of N interleaved slices of the luminosities")
+    s.add_argument("--workers", type=int, default=1, help="processes for the sweep")
+    r = commands["regimes"]
+    r.add_argument("--x", default="L", help="parameter along the first axis")
+    r.add_argument("--xlim", type=float, nargs=2, default=[0.5, 1.8])
+    r.add_argument("--y", default="gamma", help="parameter along the second axis")
+    r.add_argument("--ylim", type=float, nargs=2, default=[0.1, 0.6])
+    r.add_argument("--n", type=int, default=8, help="initial cells per axis")
+    r.add_argument("--depth", type=int, default=5, help="levels of refinement along the regime boundaries")
+    r.add_argument("--workers", type=int, default=1, help="processes for the fixed point searches")
+    return p
+
+def readWorld(args):
+    recordType = WORLDS[args.model]
+    values = {}
+    if args.params is not None:
+        with open(args.params) as f:
+            values.update(json.load(f))
+    for field in set(model.World1._fields) | set(model.World2._fields):
+        if getattr(args, field) is not None:
+            values[field] = getattr(args, field)
+    unknown = set(values) - set(recordType._fields)
+    if unknown:
+        sys.exit("Unknown parameters for the {}: {}".format(recordType.__name__, ", ".join(sorted(unknown))))
+    return recordType(**{k: float(v) for k, v in values.items()})
+
+def trajectory(world, args):
+    try:
+        return _trajectory(world, args)
+    except FloatingPointError as e:  # e.g. a negative luminosity, or initial areas outside 0..1
+        sys.exit(str(e))
+
+def _trajectory(world, args):
+    if isinstance(world, model.World1):
+        v = lambda A: model.v(A, world)
+        A0 = np.array(args.A0)
+        if args.method == "euler":
+            time, areas = integrate.euler1d(v, A0, dt=args.dt, tmax=args.tmax)
+        else:
+            time, areas, _ = integrate.adaptive1d(v, A0, tmax=args.tmax, times=np.arange(0, args.tmax, args.dt))
+        return [("t", time)] + [("A{}".format(i), areas[:, i]) for i in range(areas.shape[1])]
+    vb = lambda Ab, Aw: model.vb(Ab, Aw, world)
+    vw = lambda Ab, Aw: model.vw(Ab, Aw, world)
+    Ab0, Aw0 = np.broadcast_arrays(np.array(args.Ab0), np.array(args.Aw0))
+    if args.method == "euler":
+        time, black_areas, white_areas = integrate.euler2d(vb, vw, Ab0, Aw0, dt=args.dt, tmax=args.tmax)
+    else:
+        time, black_areas, white_areas, _ = integrate.adaptive2d(vb, vw, Ab0, Aw0, tmax=args.tmax,
+                                                                  times=np.arange(0, args.tmax, args.dt))
+    columns = [("t", time)]
+    for i in range(black_areas.shape[1]):
+        columns += [("Ab{}".format(i), black_areas[:, i]), ("Aw{}".format(i), white_areas[:, i])]
+    return columns
+
+def fixedPoints(world, args):
+    if isinstance(world, model.World1):
+        found = equilibria.fixedPoints1d(world, **_gridSize(args, "nGrid"))
+    else:
+        found = equilibria.fixedPoints2d(world, **_gridSize(args, "nTestvec"))
+    return _flatten(np.full(len(found), world.L), found, world)
+
+def luminositySweep(world, args):
+    k, n = (int(x) for x in args.part.split("/"))
+    if not 0 <= k < n:
+        sys.exit("--part must be K/N with 0 <= K < N")
+    Ls = np.arange(args.Lmin, args.Lmax + args.dL / 2, args.dL)[k::n]
+    if isinstance(world, model.World1):
+        found = sweep.equilibria1d(world, Ls, workers=args.workers, **_gridSize(args, "nGrid"))
+    else:
+        found = sweep.equilibria2d(world, Ls, workers=args.workers, **_gridSize(args, "nTestvec"))
+    Ls = np.concatenate([np.full(len(f), L) for L, f in zip(Ls, found)])
+    merged = [(p, s) for f in found for p, s in f.items()]
+    return _flatten(Ls, merged, world)
+
+def regimeMap(world, args):  # (x0, x1, y0, y1, nStable, nUnstable) columns, one row per cell; -1 on a boundary
+    solver = _gridSize(args, "nGrid" if isinstance(world, model.World1) else "nTestvec")
+    try:
+        cells, labels, found = regimes.regimeMap(world, args.x, tuple(args.xlim), args.y, tuple(args.ylim), n=args.n,
+                                                 depth=args.depth, solver=solver, workers=args.workers)
+    except ValueError as e:
+        sys.exit(str(e))
+    counts = np.vstack([found, [[-1, -1]]])[labels]  # MIXED indexes the last row
+    names = [args.x + "0", args.x + "1", args.y + "0", args.y + "1"]
+    return [(name, cells[:, i]) for i, name in enumerate(names)] + [("nStable", counts[:, 0]), ("nUnstable", counts[:, 1])]
+
+def write(path, columns, world):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npz":
+        np.savez(path, **dict(columns), **{"param_" + k: v for k, v in world._asdict().items()})
+    elif extension == ".csv":
+        header = "# {}\n{}".format(json.dumps(world._asdict()), ",".join(name for name, _ in columns))
+        np.savetxt(path, np.column_stack([c for _, c in columns]), delimiter=",", fmt="%.17g", header=header, comments="")
+    else:
+        sys.exit("Output must end in .npz or .csv: {}".format(path))
+
+def _gridSize(args, name):  # the 1D solver calls its grid nGrid, the 2D one nTestvec
+    return {} if args.nTestvec is None else {name: args.nTestvec}
+
+def _flatten(Ls, found, world):  # (L, coordinates..., stable) columns, one row per fixed point
+    items = list(found.items()) if isinstance(found, dict) else found
+    names = ["A"] if isinstance(world, model.World1) else ["Ab", "Aw"]
+    points = np.array([np.atleast_1d(p) for p, _ in items], dtype=float).reshape(len(items), len(names))
+    stable = np.array([s for _, s in items], dtype=bool)
+    columns = [("L", np.asarray(Ls, dtype=float))] + [(name, points[:, i]) for i, name in enumerate(names)]
+    return columns + [("stable", stable)]
+
+if __name__ == "__main__":
+    main()
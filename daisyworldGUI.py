@@ -2,18 +2,28 @@
 # The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
 # Author: Kun Hee Park
 
+import sys
+import time
+_launched = time.perf_counter()
 from abc import ABC, abstractmethod
 import numpy as np
-from scipy.misc.common import derivative
-from scipy.optimize import minimize
-import sys
+import basins
+import cache
+import equilibria
+import history
+import integrate
+import model
+import sweep
 import PyQt5.QtWidgets as qtw
 import PyQt5.QtGui as qtg
 import PyQt5.QtCore as qtc
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from matplotlib import rcParams
-rcParams['font.size'] = 10
+# matplotlib takes about half a second to import, so it is only imported where a
+# figure is first made, once the window is already on screen
+
+# Startup timing report on stderr, with --timing on the command line
+def _timing(event):
+    if "--timing" in sys.argv:
+        sys.stderr.write("{:7.3f} s  {}\n".format(time.perf_counter() - _launched, event))
 
 class MainWindow(qtw.QMainWindow):
     def __init__(self):
@@ -97,12 +107,31 @@ class LicenseWindow(NotificationWindow):
             "along with this program.  If not, see <a href='https://www.gnu.org/licenses/'>here</a>."
         )
 
+# A tab builds its module, controls and figure only when it is first shown, so the
+# window appears without waiting for any figure.
 class WorldTab(qtw.QWidget):
     def __init__(self, module):
         super().__init__()
+        self.moduleClass = module
+        self.module = None
         layout = qtw.QVBoxLayout()
         self.setLayout(layout)
-        self.module = module()
+        self.placeholder = qtw.QLabel("Loading...")
+        self.placeholder.setAlignment(qtc.Qt.AlignCenter)
+        layout.addWidget(self.placeholder)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.module is None:
+            qtc.QTimer.singleShot(0, self._ensureBuilt)  # after the tab has been painted
+
+    def _ensureBuilt(self):
+        if self.module is not None:
+            return
+        layout = self.layout()
+        layout.removeWidget(self.placeholder)
+        self.placeholder.deleteLater()
+        self.module = self.moduleClass()
         self.canvas = PlotCanvas(self.module)
 
         # Parameter Input Boxes
@@ -121,9 +150,31 @@ class WorldTab(qtw.QWidget):
         self.buttons[1].clicked.connect(self._run)
         layoutButtons.addWidget(qtw.QLabel("*from 0 to 1"))
         layoutButtons.addStretch()
+        self.busy = qtw.QProgressBar()  # indeterminate while the background is computed
+        self.busy.setRange(0, 0)
+        self.busy.setFixedWidth(150)
+        self.busy.setVisible(False)
+        self.canvas.busy.connect(self.busy.setVisible)
+        self.canvas.failed.connect(self._failed)
+        layoutButtons.addWidget(self.busy)
+        self.rates = qtw.QLabel()
+        self.canvas.rates.connect(lambda steps, frames: self.rates.setText("{:.0f} steps/s, {:.0f} frames/s".format(steps, frames)))
+        layoutButtons.addWidget(self.rates)
+        layoutButtons.addWidget(qtw.QLabel("Steps per second"))
+        layoutButtons.addWidget(self._newSpinBox(self.canvas.scheduler.stepsPerSecond, 1, 100000, self.canvas.scheduler.setStepsPerSecond))
+        layoutButtons.addWidget(qtw.QLabel("Frames per second"))
+        layoutButtons.addWidget(self._newSpinBox(self.canvas.scheduler.fps, 1, 120, self.canvas.setFps))
         for b in self.buttons:
             layoutButtons.addWidget(b)
 
+        # Luminosity Slider, for modules that precompute a sweep
+        self.slider = None
+        if hasattr(self.module, "scrub"):
+            self.slider = qtw.QSlider(qtc.Qt.Horizontal)
+            self.slider.valueChanged.connect(self.canvas.figScrub)
+            self.canvas.stepped.connect(self._syncSlider)
+            self._syncSlider()
+
         # Plots
         layoutPlots = qtw.QHBoxLayout()
         layoutPlots.addWidget(self.canvas)
@@ -131,7 +182,17 @@ class WorldTab(qtw.QWidget):
         # And finally...
         layout.addLayout(layoutInputBoxes)
         layout.addLayout(layoutButtons)
+        if self.slider is not None:
+            layout.addWidget(self.slider)
         layout.addLayout(layoutPlots)
+        self.canvas.figInit()
+        _timing("{} tab built".format(self.moduleClass.__name__))
+
+    def _syncSlider(self):  # follow the module without scrubbing it back
+        self.slider.blockSignals(True)
+        self.slider.setRange(0, len(self.module.Ls) - 1)
+        self.slider.setValue(self.module.index)
+        self.slider.blockSignals(False)
 
     def _newInputBox(self, text, width=300):
         inputbox = qtw.QLineEdit()
@@ -139,6 +200,14 @@ class WorldTab(qtw.QWidget):
         inputbox.setFixedWidth(width)
         return inputbox
     
+    def _newSpinBox(self, value, minimum, maximum, function, width=100):
+        spinbox = qtw.QSpinBox()
+        spinbox.setRange(minimum, maximum)
+        spinbox.setValue(value)
+        spinbox.setFixedWidth(width)
+        spinbox.valueChanged.connect(function)
+        return spinbox
+    
     def _newButton(self, text, height=30, width=300, function=None, *args):
         button = qtw.QPushButton("{}".format(text))
         button.setFixedHeight(height)
@@ -167,13 +236,20 @@ class WorldTab(qtw.QWidget):
                 self.buttons[1].setText("Stop")
                 self.module.setupEvolution()
                 self.canvas.setDaisyWorld(self.module)
-                self.canvas.figInit()
-                self.canvas.figRun()
+                self.canvas.figStart()
+                if self.slider is not None:
+                    self._syncSlider()
                 self.buttons[1].setStyleSheet("color: black;")
-            except Exception as e:
-                self.buttons[1].setStyleSheet("color: red;")
+            except Exception as e:  # bad input, or a trajectory the integrator cannot follow
+                self._failed(e)
+                return
         self.canvas.isRunning = not self.canvas.isRunning
 
+    def _failed(self, error):  # the background computation or the trajectory raised
+        self.buttons[1].setText("Rerun!")
+        self.buttons[1].setStyleSheet("color: red;")
+        self.canvas.isRunning = False
+
     def _mod2box(self):
         values = [str(p.value) for p in self.module.parameters.get()]
         for i in range(len(self.inputboxes)):
@@ -183,13 +259,35 @@ class WorldTab(qtw.QWidget):
         values = [float(ib.text()) for ib in self.inputboxes]
         self.module.parameters.set(values)
 
-class PlotCanvas(FigureCanvas):
+# The matplotlib canvas is held rather than inherited from, so that its backend
+# is imported with the first figure instead of with this module.
+class PlotCanvas(qtw.QWidget):
+    busy = qtc.pyqtSignal(bool)
+    failed = qtc.pyqtSignal(object)
+    rates = qtc.pyqtSignal(float, float)  # achieved steps/s and frames/s, about once a second
+    stepped = qtc.pyqtSignal()  # a frame advanced the module
+
     def __init__(self, daisyWorld, width=10, height=12, dpi=100):
         self.isRunning = False
         self.DW = daisyWorld
-        fig = self.DW.generateFigure(width, height, dpi)
-        FigureCanvas.__init__(self, fig)
-        self.figInit()
+        self.ticket = Ticket()
+        self.workers = set()
+        self.scheduler = Scheduler()
+        self.artists = []
+        self.blitBackground = None
+        self.ready = False  # the background matches the module
+        self.drawnStamp = None  # parameter versions the drawn background was computed from
+        super().__init__()
+        from matplotlib import rcParams
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        rcParams['font.size'] = 10
+        self.figure = self.DW.generateFigure(width, height, dpi)
+        self.figureCanvas = FigureCanvas(self.figure)
+        self.figureCanvas.mpl_connect("draw_event", self._cacheBackground)
+        layout = qtw.QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.figureCanvas)
+        self.setLayout(layout)
 
         self.timer = qtc.QTimer(self)
         self.timer.timeout.connect(self._update)
@@ -197,45 +295,222 @@ class PlotCanvas(FigureCanvas):
     def setDaisyWorld(self, daisyWorld):
         self.DW = daisyWorld
 
-    def figRun(self, milliseconds=0):
-        self.timer.start(milliseconds)
+    def figRun(self):
+        self.timer.start(int(1000 / self.scheduler.fps))
+
+    def setFps(self, fps):
+        self.scheduler.fps = fps
+        if self.timer.isActive():
+            self.timer.setInterval(int(1000 / fps))
     
     def figStop(self):
         self.timer.stop()
+        self.ticket.cancelled = True
+        self.busy.emit(False)
+
+    def figInit(self):  # first draw, without running; the background is computed off the main thread
+        stamp = self.DW.parameters.stamp("background")
+        self.busy.emit(True)
+        self._submit(lambda background: self._started(background, stamp, run=False))
+
+    def figStart(self):  # compute the background off the main thread unless it is still valid, then draw and run
+        stamp = self.DW.parameters.stamp("background")
+        if self.ready and stamp == self.drawnStamp:  # keep the axes, start only the foreground over
+            self._drawFrame(self.DW.resetForeground())
+            self.scheduler.resume()
+            self.figRun()
+            return
+        self.ready = False
+        self.busy.emit(True)
+        self._submit(lambda background: self._started(background, stamp))
+
+    def figScrub(self, index):  # show one luminosity of a precomputed sweep
+        if self.ready:
+            self.DW.scrub(index)
+            self._drawFrame(self.DW.drawForeground())
+
+    def _started(self, background, stamp, run=True):
+        self.busy.emit(False)
+        self.drawnStamp = stamp
+        self.DW.background = background
+        self._drawInit()
+        if run:
+            self.scheduler.resume()
+            self.figRun()
+        else:
+            _timing("{} drawn".format(type(self.DW).__name__))
 
-    def figInit(self):
+    def _drawInit(self):
         for ax in self.DW.axes:
             ax.cla()
         self.DW.drawBackground()
-        self.draw()
+        self.artists = self.DW.initForeground()
+        titles = [ax.title for ax in self.DW.axes]
+        for a in self.artists:
+            a.set_animated(True)
+            a.set_in_layout(a in titles)  # data artists change every frame and may start empty
+        self.ready = True
+        self.figureCanvas.draw()
+
+    # Animated artists are left out of full draws. Each full draw is cached, so a
+    # frame only restores the cache and redraws the artists that change; a full
+    # draw is needed only when drawForeground moves the axes.
+    def _cacheBackground(self, event):
+        self.blitBackground = self.figureCanvas.copy_from_bbox(self.figure.bbox)
+        self._drawArtists()
+
+    def _drawArtists(self):
+        for a in self.artists:
+            self.figure.draw_artist(a)
 
     def _update(self):
-        self.flush_events()
-        self.DW.evolve()
-        self.DW.drawForeground()
-        self.draw()
+        self.figureCanvas.flush_events()
+        nSteps = self.scheduler.steps()
+        redraw = False
+        for _ in range(nSteps):
+            self.DW.evolve()
+            redraw = self.DW.drawForeground() or redraw
+        if nSteps:
+            self._drawFrame(redraw)
+            self.stepped.emit()
+        rates = self.scheduler.frameDone(nSteps)
+        if rates is not None:
+            self.rates.emit(*rates)
+
+    def _drawFrame(self, redraw):
+        if redraw or self.blitBackground is None:
+            self.figureCanvas.draw()
+        else:
+            self.figureCanvas.restore_region(self.blitBackground)
+            self._drawArtists()
+            self.figureCanvas.blit(self.figure.bbox)
+
+    # Run DW.computeBackground on the shared thread pool. Only the snapshot taken by
+    # DW.backgroundInputs (the immutable world record, arrays that are replaced but
+    # never modified) crosses to the worker; a result arrives through a queued
+    # signal and is dropped if figStop or a newer submission has cancelled its
+    # ticket since.
+    def _submit(self, onResult):
+        self.ticket.cancelled = True
+        ticket = self.ticket = Ticket()
+        worker = BackgroundWorker(self.DW.computeBackground, *self.DW.backgroundInputs())
+        worker.signals.finished.connect(lambda result: self._finished(worker, ticket, onResult, result))
+        worker.signals.failed.connect(lambda error: self._finished(worker, ticket, self._failed, error))
+        self.workers.add(worker)  # a running worker must outlive a cancelled ticket
+        qtc.QThreadPool.globalInstance().start(worker)
+
+    def _finished(self, worker, ticket, handler, value):
+        self.workers.discard(worker)
+        if not ticket.cancelled:
+            handler(value)
+
+    def _failed(self, error):
+        self.figStop()
+        self.failed.emit(error)
+
+# Paces the simulation by the wall clock rather than by the frame rate: every frame
+# takes the steps that stepsPerSecond has accrued since the previous one, so slow
+# and fast machines cover the same simulated time, while the canvas timer caps
+# drawing at fps. maxStepsPerFrame keeps a stalled frame from snowballing.
+class Scheduler:
+    def __init__(self, stepsPerSecond=60, fps=30, maxStepsPerFrame=1000):
+        self.stepsPerSecond = stepsPerSecond
+        self.fps = fps
+        self.maxStepsPerFrame = maxStepsPerFrame
+        self.resume()
+
+    def setStepsPerSecond(self, stepsPerSecond):
+        self.stepsPerSecond = stepsPerSecond
+
+    def resume(self):  # forget time spent stopped
+        self.last = time.perf_counter()
+        self.owed = 0.
+        self.since, self.nSteps, self.nFrames = self.last, 0, 0
+
+    def steps(self):
+        now = time.perf_counter()
+        self.owed += (now - self.last) * self.stepsPerSecond
+        self.last = now
+        n = min(int(self.owed), self.maxStepsPerFrame)
+        self.owed = min(self.owed - n, 1.)
+        return n
+
+    def frameDone(self, nSteps):  # (steps/s, frames/s) once a second has passed, else None
+        self.nSteps += nSteps
+        self.nFrames += 1
+        elapsed = time.perf_counter() - self.since
+        if elapsed < 1:
+            return None
+        rates = (self.nSteps / elapsed, self.nFrames / elapsed)
+        self.since, self.nSteps, self.nFrames = time.perf_counter(), 0, 0
+        return rates
+
+class Ticket:
+    def __init__(self):
+        self.cancelled = False
+
+class BackgroundSignals(qtc.QObject):
+    finished = qtc.pyqtSignal(object)
+    failed = qtc.pyqtSignal(object)
+
+class BackgroundWorker(qtc.QRunnable):
+    def __init__(self, function, *args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.function = function
+        self.args = args
+        self.signals = BackgroundSignals()
+
+    def run(self):
+        try:
+            result = self.function(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)
     
+# Derived products (the parameter record, the background, the trajectory) are
+# declared with the parameters they depend on. A product's stamp is the versions
+# of those parameters, and a memoized product is reused until its stamp changes,
+# so a rerun recomputes only what an edited parameter actually feeds into.
 class Parameters:
     def __init__(self):
-        pass
+        self._dependencies = {}
+        self._memo = {}
 
     def add(self, attribute, parameter):
         setattr(self, attribute, parameter)
         self.unitRangeCheck()
 
     def get(self):
-        return [v for v in self.__dict__.values()]
+        return [v for v in self.__dict__.values() if isinstance(v, Parameter)]
     
     def set(self, values):
-        i = 0
-        for v in vars(self):
-            vars(self)[v].setValue(values[i])
-            i += 1
+        for p, value in zip(self.get(), values):
+            p.setValue(value)
         self.unitRangeCheck()
 
     def reset(self):
-        for v in vars(self):
-            vars(self)[v].resetValue()
+        for p in self.get():
+            p.resetValue()
+
+    def depend(self, product, *attributes):
+        self._dependencies[product] = attributes
+
+    def stamp(self, product):
+        return tuple(vars(self)[a].version for a in self._dependencies[product])
+
+    def memo(self, product, function):  # function(self), recomputed only when the stamp changes
+        stamp = self.stamp(product)
+        if (product not in self._memo) or (self._memo[product][0] != stamp):
+            self._memo[product] = (stamp, function(self))
+        return self._memo[product][1]
+
+    def record(self, recordType, **values):  # immutable snapshot, e.g. a model.World1
+        for field in recordType._fields:
+            if field not in values:
+                values[field] = vars(self)[field].value
+        return recordType(**values)
     
     def unitRangeCheck(self):  # induce value error downstream
         if hasattr(self, "Ab0") and hasattr(self, "Aw0"):
@@ -246,6 +521,8 @@ class Parameter:
         self.name = name
         self.short = short
         self.unitRange = unitRange
+        self.value = None
+        self.version = 0  # bumped whenever the value changes
         self.setValue(value)
         self.default = self.value
     
@@ -253,13 +530,34 @@ class Parameter:
         return self.value
     
     def setValue(self, value):
+        if value != self.value:
+            self.version += 1
         self.value = value
         if self.unitRange:
             if (value < 0) or (1 < value):
                 raise ValueError("Parameter value out of range!")
                 
     def resetValue(self):
-        self.value = self.default
+        self.setValue(self.default)
+
+class Trace:  # one persistent line showing the bounded, decimated history of its points
+    def __init__(self, line, key=-1):
+        self.line = line
+        self.history = history.History(3 if hasattr(line, "set_data_3d") else 2, key=key)
+
+    def append(self, *coords):
+        self.history.append(*coords)
+        self._update()
+
+    def clear(self):
+        self.history.clear()
+        self._update()
+
+    def _update(self):
+        if self.history.nDims == 3:
+            self.line.set_data_3d(*self.history.vertices())
+        else:
+            self.line.set_data(*self.history.vertices())
 
 class FixedPoint:
     def __init__(self, coords, stable=None):
@@ -268,6 +566,7 @@ class FixedPoint:
 
 class Module(ABC):
     def generateFigure(self, width, height, dpi):
+        from matplotlib.figure import Figure
         self.axes = []
         fig = Figure(figsize=(width, height), dpi=dpi)
         fig.set_tight_layout(True)
@@ -283,12 +582,25 @@ class Module(ABC):
     def evolve(self):
         pass
 
+    def backgroundInputs(self):  # taken on the GUI thread when the background is submitted
+        return self.world,
+
     @abstractmethod
-    def drawBackground(self):
+    def computeBackground(self, world):  # runs on a worker thread on backgroundInputs(): numbers only, no artists
         pass
 
     @abstractmethod
-    def drawForeground(self):
+    def drawBackground(self):  # draws self.background
+        pass
+
+    def initForeground(self):  # persistent artists to animate, created after drawBackground
+        return []
+
+    def resetForeground(self):  # start the foreground over on the same background; True if the axes need a full redraw
+        return False
+
+    @abstractmethod
+    def drawForeground(self):  # updates the foreground; True if the axes need a full redraw
         pass
 
 class DaisyWorld1(Module):
@@ -303,47 +615,43 @@ class DaisyWorld1(Module):
         self.parameters.add("sigma", Parameter("Stefan-Boltzmann Constant", "σ", 5.67e-8))
         self.parameters.add("Ti", Parameter("Ideal Growth Temperature", "T<sub>i</sub>", 22.5))
         self.parameters.add("gamma", Parameter("Death Rate", "γ", 0.3, unitRange=True))
+        self.parameters.depend("world", *model.World1._fields)
+        self.parameters.depend("background", *model.World1._fields)  # vector field, fixed points, stability
+        self.parameters.depend("trajectory", "A0", *model.World1._fields)
 
         self.setupEvolution()
 
     def v(self, A):  # dA/dt
-        ap = A * self.parameters.ai.value + (1 - A) * self.parameters.ag.value  # planet albedo
-        Te = (self.parameters.L.value * (self.parameters.S.value / self.parameters.sigma.value) * (1 - ap)) ** 0.25  # planet temp
-        T = (self.parameters.R.value * self.parameters.L.value * (self.parameters.S.value / self.parameters.sigma.value) * \
-            (ap - self.parameters.ai.value) + (Te ** 4)) ** 0.25  # daisy temp
-        b = 1 - (0.003265 * ((273.15 + self.parameters.Ti.value) - T) ** 2)  # daisy growth rate
-        return A * ((1 - A) * b - self.parameters.gamma.value)
+        return model.v(A, self.world)
 
     def setupEvolution(self):
+        self.world = self.parameters.memo("world", lambda p: p.record(model.World1))
         self.evolution = Parameters()
         self.evolution.add("t", Parameter("Time", "t", 0.))
         self.evolution.add("A", Parameter("Daisy Area", "A", self.parameters.A0.value))
         self.evolution.add("v", Parameter("Rate of Change of Daisy Area", "dA/dt", self.v(self.evolution.A.value)))
+        # adaptive steps up to the steady state, sampled frame by frame through the dense output;
+        # this runs on the GUI thread, so the step budget keeps a stiff trajectory from freezing it
+        self.trajectory = self.parameters.memo("trajectory",
+                                               lambda p: integrate.adaptive1d(self.v, p.A0.value, tmax=1000, maxSteps=10000)[2])
 
     def evolve(self, dt=.025):
         self.evolution.t.value += dt
-        self.evolution.A.value += self.v(self.evolution.A.value) * dt
+        self.evolution.A.value = float(self.trajectory(self.evolution.t.value))
         self.evolution.v.value = self.v(self.evolution.A.value)
 
-    def drawBackground(self):
+    def computeBackground(self, world):
         As = np.linspace(0, 1, num=101)
+        return As, model.v(As, world), equilibria.fixedPoints1d(world)
+
+    def drawBackground(self):
+        As, vs, fixedPoints = self.background
         self.axes[1].plot(As, np.zeros(As.shape), ':', color="#8080ff")
-        self.axes[1].plot(As, self.v(As), color="#8080ff")
+        self.axes[1].plot(As, vs, color="#8080ff")
 
-        def _cost(A):
-            return self.v(A) ** 2
         self.fixedPoints = []
-        dp = 1e-5
-        xtol = 1e-7
-        ctol = 1e-7
-        testvec = np.linspace(0, 1, num=21)
-        for A0 in testvec:
-            res = minimize(_cost, A0, method="nelder-mead", options={"xtol": xtol})
-            p = round(res.x[0], 5)
-            if (p not in [fps.coords for fps in self.fixedPoints]) and (0 <= p <= 1) and (_cost(p) < ctol):
-                fp = FixedPoint([p])
-                fp.stable = (self.v(p + dp) - self.v(p - dp) < 0)
-                self.fixedPoints.append(fp)
+        for p, stable in fixedPoints.items():
+            self.fixedPoints.append(FixedPoint([p], stable))
         for fp in self.fixedPoints:
             self.axes[1].plot(fp.coords[0], 0, "b^" if fp.stable else "rv", markersize=12, clip_on=False)
 
@@ -354,9 +662,21 @@ class DaisyWorld1(Module):
         self.axes[1].set_ylabel("Rate of Change of Daisy Area ($dA/dt$)")
         self.axes[1].set_xlim(0, 1)
 
+    def initForeground(self):
+        self.traces = [Trace(self.axes[0].plot([], [], color="#ff8080", marker='o', linestyle="")[0]),
+                       Trace(self.axes[1].plot([], [], color="#ff8080", marker='o', linestyle="")[0])]
+        self.axes[0].set_xlim(0, 1)
+        return [trace.line for trace in self.traces]
+
+    def resetForeground(self):
+        for trace in self.traces:
+            trace.clear()
+        return False
+
     def drawForeground(self):
-        self.axes[0].plot(self.evolution.t.value, self.evolution.A.value, color="#ff8080", marker='o')
-        self.axes[1].plot(self.evolution.A.value, self.evolution.v.value, color="#ff8080", marker='o')
+        self.traces[0].append(self.evolution.t.value, self.evolution.A.value)
+        self.traces[1].append(self.evolution.A.value, self.evolution.v.value)
+        return _extendTimeAxis(self.axes[0], self.evolution.t.value)
 
 class DaisyWorld2(Module):
     def __init__(self):
@@ -372,63 +692,50 @@ class DaisyWorld2(Module):
         self.parameters.add("sigma", Parameter("Stefan-Boltzmann Constant", "σ", 5.67e-8))
         self.parameters.add("Ti", Parameter("Ideal Growth Temperature", "T<sub>i</sub>", 22.5))
         self.parameters.add("gamma", Parameter("Death Rate", "γ", 0.3, unitRange=True))
+        self.parameters.depend("world", *model.World2._fields)
+        self.parameters.depend("background", *model.World2._fields)  # vector field, fixed points, stability, streamlines
+        self.parameters.depend("trajectory", "Ab0", "Aw0", *model.World2._fields)
 
         self.setupEvolution()
 
     def vb(self, Ab, Aw):  # dA/dt of Black Daisy
-        ap = Aw * self.parameters.aw.value + Ab * self.parameters.ab.value + (1 - Aw - Ab) * self.parameters.ag.value  # Planet Albedo
-        Te = (self.parameters.L.value * (self.parameters.S.value / self.parameters.sigma.value) * (1 - ap)) ** 0.25  # Planet Temp
-        Tb = (self.parameters.R.value * self.parameters.L.value * (self.parameters.S.value / self.parameters.sigma.value) * \
-             (ap - self.parameters.ab.value) + (Te ** 4)) ** 0.25  # Black Daisy Temp
-        bb = 1 - (0.003265 * ((273.15 + self.parameters.Ti.value) - Tb) ** 2)  # Black Daisy Growth Rate
-        return Ab * ((1 - Ab - Aw) * bb - self.parameters.gamma.value)
+        return model.vb(Ab, Aw, self.world)
 
     def vw(self, Ab, Aw):  # dA/dt of White Daisy
-        ap = Aw * self.parameters.aw.value + Ab * self.parameters.ab.value + (1 - Aw - Ab) * self.parameters.ag.value  # Planet Albedo
-        Te = (self.parameters.L.value * (self.parameters.S.value / self.parameters.sigma.value) * (1 - ap)) ** 0.25  # Planet Temp
-        Tw = (self.parameters.R.value * self.parameters.L.value * (self.parameters.S.value / self.parameters.sigma.value) * \
-             (ap - self.parameters.aw.value) + (Te ** 4)) ** 0.25  # White Daisy Temp
-        bw = 1 - (0.003265 * ((273.15 + self.parameters.Ti.value) - Tw) ** 2)  # White Daisy Growth Rate
-        return Aw * ((1 - Aw - Ab) * bw - self.parameters.gamma.value)
+        return model.vw(Ab, Aw, self.world)
+
+    def jacobian(self, Ab, Aw):  # closed-form partial derivatives of (vb, vw)
+        return model.jacobian2d(Ab, Aw, self.world)
     
     def setupEvolution(self):
+        self.world = self.parameters.memo("world", lambda p: p.record(model.World2))
         self.evolution = Parameters()
         self.evolution.add("t", Parameter("Time", "t", 0.))
         self.evolution.add("Ab", Parameter("Black Daisy Area", "Ab", self.parameters.Ab0.value))
         self.evolution.add("Aw", Parameter("White Daisy Area", "Aw", self.parameters.Aw0.value))
+        # adaptive steps up to the steady state, sampled frame by frame through the dense output;
+        # this runs on the GUI thread, so the step budget keeps a stiff trajectory from freezing it
+        self.trajectory = self.parameters.memo("trajectory",
+                                               lambda p: integrate.adaptive2d(self.vb, self.vw, p.Ab0.value, p.Aw0.value,
+                                                                              tmax=1000, maxSteps=10000)[3])
 
     def evolve(self, dt=.05):
         self.evolution.t.value += dt
-        self.evolution.Ab.value += self.vb(self.evolution.Ab.value, self.evolution.Aw.value) * dt
-        self.evolution.Aw.value += self.vw(self.evolution.Ab.value, self.evolution.Aw.value) * dt
+        Ab, Aw = self.trajectory(self.evolution.t.value)
+        self.evolution.Ab.value, self.evolution.Aw.value = float(Ab), float(Aw)
+
+    def computeBackground(self, world):
+        return _stateSpace(world, nTestvec=21) + (basins.basins2d(world, n=150, workers=1),)
 
     def drawBackground(self):
-        Aws, Abs = np.mgrid[0:1:100j, 0:1:100j]
-        vbs = self.vb(Abs, Aws)
-        vws = self.vw(Abs, Aws)
-        mask = np.zeros(vws.shape, dtype=bool)
-        for i in range(len(vws)):
-            vws[i, len(vws) - i:] = np.nan
-            vws = np.ma.array(vws, mask=mask)
-        self.axes[1].streamplot(Abs, Aws, vbs, vws, color="#8080ff", density=1.5)
+        lines, fixedPoints, (ab, aw, labels, _, _) = self.background
+        self.axes[1].imshow(basins.image(labels), origin="lower", extent=basins.extent(ab, aw),
+                            interpolation="nearest", aspect="auto", zorder=0)
+        _drawStreamlines(self.axes[1], lines, color="#8080ff")
         
-        def _cost(A):
-            return self.vb(A[0], A[1]) ** 2 + self.vw(A[0], A[1]) ** 2
         self.fixedPoints = []
-        xtol = 1e-7
-        ctol = 1e-7
-        testvec = np.linspace(0, 1, num=21)
-        for Ab0 in testvec:
-            for Aw0 in testvec:
-                if (Ab0 + Aw0) <= 1:
-                    A0 = np.array([Ab0, Aw0])
-                    res = minimize(_cost, A0, method="nelder-mead", options={'xtol': xtol})
-                    pb = round(res.x[0], 5)
-                    pw = round(res.x[1], 5)
-                    if ([pb, pw] not in [fps.coords for fps in self.fixedPoints]) and ((pb + pw) <= 1) and (pb >= 0) and (pw >= 0) and (_cost([pb, pw]) < ctol):
-                        fp = FixedPoint([pb, pw])
-                        fp.stable = self._JacobianStability(fp)
-                        self.fixedPoints.append(fp)
+        for p, stable in fixedPoints.items():
+            self.fixedPoints.append(FixedPoint(list(p), stable))
         for fp in self.fixedPoints:
             self.axes[1].plot(fp.coords[0], fp.coords[1], "b^" if fp.stable else "rv", markersize=12, clip_on=False)
     
@@ -440,27 +747,28 @@ class DaisyWorld2(Module):
         self.axes[1].set_xlim(-0.05, 1.05)
         self.axes[1].set_ylim(-0.05, 1.05)
     
-    def drawForeground(self):
-        self.axes[0].plot(self.evolution.t.value, self.evolution.Ab.value, color="#ff00c0", marker='o')
-        self.axes[0].plot(self.evolution.t.value, self.evolution.Aw.value, color="#ffc000", marker='o')
-        self.axes[1].plot(self.evolution.Ab.value, self.evolution.Aw.value, color="#ff8000", marker='o')
-
-    def _JacobianStability(self, fixedPoint):
-        def partial_derivative(v, coords, idx):
-            args = coords[:]
-            def wraps(x):
-                args[idx] = x
-                return v(*args)
-            return derivative(wraps, coords[idx], dx=1e-5)
-
-        j00 = partial_derivative(self.vb, fixedPoint.coords, 0)
-        j01 = partial_derivative(self.vb, fixedPoint.coords, 1)
-        j10 = partial_derivative(self.vw, fixedPoint.coords, 0)
-        j11 = partial_derivative(self.vw, fixedPoint.coords, 1)
-        jacobian = np.array([[j00, j01], [j10, j11]])
-        eigval, _ = np.linalg.eig(jacobian)
-        return (eigval[0] < 0 and eigval[1] < 0)
+    def initForeground(self):
+        self.traces = [Trace(self.axes[0].plot([], [], color="#ff00c0", marker='o', linestyle="")[0]),
+                       Trace(self.axes[0].plot([], [], color="#ffc000", marker='o', linestyle="")[0]),
+                       Trace(self.axes[1].plot([], [], color="#ff8000", marker='o', linestyle="")[0])]
+        self.axes[0].set_xlim(0, 1)
+        return [trace.line for trace in self.traces]
+
+    def resetForeground(self):
+        for trace in self.traces:
+            trace.clear()
+        return False
 
+    def drawForeground(self):
+        self.traces[0].append(self.evolution.t.value, self.evolution.Ab.value)
+        self.traces[1].append(self.evolution.t.value, self.evolution.Aw.value)
+        self.traces[2].append(self.evolution.Ab.value, self.evolution.Aw.value)
+        return _extendTimeAxis(self.axes[0], self.evolution.t.value)
+
+# The bifurcation tabs compute the whole luminosity sweep once, on the worker,
+# into flat arrays: per-luminosity fields and every fixed point as (luminosity
+# index, coordinates, stability). Playing or scrubbing a luminosity then only
+# updates the data of a few persistent artists.
 class Bifurcation1(Module):
     def __init__(self):
         self.parameters = Parameters()
@@ -474,60 +782,75 @@ class Bifurcation1(Module):
         self.parameters.add("sigma", Parameter("Stefan-Boltzmann Constant", "σ", 5.67e-8))
         self.parameters.add("Ti", Parameter("Ideal Growth Temperature", "T<sub>i</sub>", 22.5))
         self.parameters.add("gamma", Parameter("Death Rate", "γ", 0.3, unitRange=True))
+        self.parameters.depend("background", "Lmin", "Lmax", "dL", *(f for f in model.World1._fields if f != "L"))
 
         self.setupEvolution()
 
     def v(self, A):  # dA/dt
-        ap = A * self.parameters.ai.value + (1 - A) * self.parameters.ag.value  # planet albedo
-        Te = (self.evolution.L.value * (self.parameters.S.value / self.parameters.sigma.value) * (1 - ap)) ** 0.25  # planet temp
-        T = (self.parameters.R.value * self.evolution.L.value * (self.parameters.S.value / self.parameters.sigma.value) * \
-            (ap - self.parameters.ai.value) + (Te ** 4)) ** 0.25  # daisy temp
-        b = 1 - (0.003265 * ((273.15 + self.parameters.Ti.value) - T) ** 2)  # daisy growth rate
-        return A * ((1 - A) * b - self.parameters.gamma.value)
+        return model.v(A, self.world)
 
     def setupEvolution(self):
+        self.Ls = _luminosities(self.parameters)
         self.evolution = Parameters()
-        self.evolution.add("L", Parameter("Luminosity", "L", self.parameters.Lmin.value))
+        self.evolution.add("L", Parameter("Luminosity", "L", self.Ls[0]))
+        self.world = self.parameters.record(model.World1, L=self.evolution.L.value)
+        self.index = 0
 
     def evolve(self):
-        self.evolution.L.value += self.parameters.dL.value
+        self.scrub(min(self.index + 1, len(self.Ls) - 1))
 
-    def drawBackground(self):
-        self.axes[0].set_title("L = {:.03f}".format(self.evolution.L.value))
+    def scrub(self, index):
+        self.index = index
+        self.evolution.L.value = self.Ls[index]
+        self.world = self.world._replace(L=self.evolution.L.value)
+
+    def backgroundInputs(self):  # the luminosities too, which the next setupEvolution replaces
+        return self.world, self.Ls
+
+    def computeBackground(self, world, Ls):
         As = np.linspace(0, 1, num=101)
-        self.axes[0].plot(As, np.zeros(As.shape), ':', color="#8080ff")
-        self.axes[0].plot(As, self.v(As), color="#8080ff")
+        vs = model.v(As, world._replace(L=Ls[:, None]))
+        index, points, stable = _sweep(sweep.equilibria1d(world, Ls, workers=1))
+        return As, vs, index, points, stable
 
-        def _cost(A):
-            return self.v(A) ** 2
-        self.fixedPoints = []
-        dp = 1e-5
-        ctol = 1e-7
-        xtol = 1e-7
-        testvec = np.linspace(0, 1, num=21)
-        for A0 in testvec:
-            res = minimize(_cost, A0, method="nelder-mead", options={"xtol": xtol})
-            p = round(res.x[0], 5)
-            if (p not in [fps.coords for fps in self.fixedPoints]) and (0 <= p <= 1) and (_cost(p) < ctol):
-                fp = FixedPoint([p])
-                fp.stable = (self.v(p + dp) - self.v(p - dp) < 0)
-                self.fixedPoints.append(fp)
-        for fp in self.fixedPoints:
-            self.axes[0].plot(fp.coords[0], 0, "b^" if fp.stable else "rv", markersize=12, clip_on=False)
-            self.axes[1].plot(fp.coords[0], self.evolution.L.value, "b^" if fp.stable else "rv", markersize=12, clip_on=False)
+    def drawBackground(self):
+        As, vs, index, points, stable = self.background
+        self.axes[0].plot(As, np.zeros(As.shape), ':', color="#8080ff")
+        for mask, style in ((stable, "b^"), (~stable, "rv")):
+            self.axes[1].plot(points[mask], self.Ls[index[mask]], style, alpha=0.3, clip_on=False)
             
         self.axes[0].set_xlabel("Daisy Area ($A$)")
         self.axes[0].set_ylabel("Rate of Change of Daisy Area ($dA/dt$)")
         self.axes[0].set_xlim(0, 1)
+        self.axes[0].set_ylim(*_padded(vs))
         self.axes[1].set_xlabel("Daisy Area ($A$)")
         self.axes[1].set_ylabel("Luminosity ($L$)")
         self.axes[1].set_xlim(0, 1)
         self.axes[1].set_ylim(self.parameters.Lmin.value, self.parameters.Lmax.value)
 
+    def initForeground(self):
+        self.curve, = self.axes[0].plot([], [], color="#8080ff")
+        self.marks = [self.axes[0].plot([], [], style, markersize=12, clip_on=False)[0] for style in ("b^", "rv")]
+        self.current = [self.axes[1].plot([], [], style, markersize=12, clip_on=False)[0] for style in ("b^", "rv")]
+        self.level = self.axes[1].axhline(self.Ls[0], color="#8080ff", linestyle=':')
+        self.drawForeground()
+        return [self.curve, self.axes[0].title, self.level] + self.marks + self.current
+
+    def resetForeground(self):
+        return self.drawForeground()
+
     def drawForeground(self):
-        if self.evolution.L.value <= self.parameters.Lmax.value:
-            self.axes[0].cla()
-            self.drawBackground()
+        As, vs, index, points, stable = self.background
+        L = self.Ls[self.index]
+        self.axes[0].set_title("L = {:.03f}".format(L))
+        self.curve.set_data(As, vs[self.index])
+        here = index == self.index
+        self.fixedPoints = [FixedPoint([float(p)], bool(s)) for p, s in zip(points[here], stable[here])]
+        for marks, current, mask in zip(self.marks, self.current, (here & stable, here & ~stable)):
+            marks.set_data(points[mask], np.zeros(mask.sum()))
+            current.set_data(points[mask], np.full(mask.sum(), L))
+        self.level.set_ydata([L, L])
+        return False
 
 class Bifurcation2(Module):
     def __init__(self):
@@ -543,63 +866,54 @@ class Bifurcation2(Module):
         self.parameters.add("sigma", Parameter("Stefan-Boltzmann Constant", "σ", 5.67e-8))
         self.parameters.add("Ti", Parameter("Ideal Growth Temperature", "T<sub>i</sub>", 22.5))
         self.parameters.add("gamma", Parameter("Death Rate", "γ", 0.3, unitRange=True))
+        self.parameters.depend("background", "Lmin", "Lmax", "dL", *(f for f in model.World2._fields if f != "L"))
 
         self.setupEvolution()
 
     def vb(self, Ab, Aw):  # dA/dt of Black Daisy
-        ap = Aw * self.parameters.aw.value + Ab * self.parameters.ab.value + (1 - Aw - Ab) * self.parameters.ag.value  # Planet Albedo
-        Te = (self.evolution.L.value * (self.parameters.S.value / self.parameters.sigma.value) * (1 - ap)) ** 0.25  # Planet Temp
-        Tb = (self.parameters.R.value * self.evolution.L.value * (self.parameters.S.value / self.parameters.sigma.value) * \
-             (ap - self.parameters.ab.value) + (Te ** 4)) ** 0.25  # Black Daisy Temp
-        bb = 1 - (0.003265 * ((273.15 + self.parameters.Ti.value) - Tb) ** 2)  # Black Daisy Growth Rate
-        return Ab * ((1 - Ab - Aw) * bb - self.parameters.gamma.value)
+        return model.vb(Ab, Aw, self.world)
 
     def vw(self, Ab, Aw):  # dA/dt of White Daisy
-        ap = Aw * self.parameters.aw.value + Ab * self.parameters.ab.value + (1 - Aw - Ab) * self.parameters.ag.value  # Planet Albedo
-        Te = (self.evolution.L.value * (self.parameters.S.value / self.parameters.sigma.value) * (1 - ap)) ** 0.25  # Planet Temp
-        Tw = (self.parameters.R.value * self.evolution.L.value * (self.parameters.S.value / self.parameters.sigma.value) * \
-             (ap - self.parameters.aw.value) + (Te ** 4)) ** 0.25  # White Daisy Temp
-        bw = 1 - (0.003265 * ((273.15 + self.parameters.Ti.value) - Tw) ** 2)  # White Daisy Growth Rate
-        return Aw * ((1 - Aw - Ab) * bw - self.parameters.gamma.value)
+        return model.vw(Ab, Aw, self.world)
+
+    def jacobian(self, Ab, Aw):  # closed-form partial derivatives of (vb, vw)
+        return model.jacobian2d(Ab, Aw, self.world)
 
     def setupEvolution(self):
+        self.Ls = _luminosities(self.parameters)
         self.evolution = Parameters()
-        self.evolution.add("L", Parameter("Luminosity", "L", self.parameters.Lmin.value))
+        self.evolution.add("L", Parameter("Luminosity", "L", self.Ls[0]))
+        self.world = self.parameters.record(model.World2, L=self.evolution.L.value)
+        self.index = 0
 
     def evolve(self):
-        self.evolution.L.value += self.parameters.dL.value
+        self.scrub(min(self.index + 1, len(self.Ls) - 1))
+
+    def scrub(self, index):
+        self.index = index
+        self.evolution.L.value = self.Ls[index]
+        self.world = self.world._replace(L=self.evolution.L.value)
+
+    # A streamplot per luminosity would take most of a second each, so the sweep
+    # shows the direction of (dAb/dt, dAw/dt) on a coarse grid instead
+    def backgroundInputs(self):  # the luminosities too, which the next setupEvolution replaces
+        return self.world, self.Ls
+
+    def computeBackground(self, world, Ls):
+        Aws, Abs = np.mgrid[0:1:21j, 0:1:21j]
+        w = world._replace(L=Ls[:, None, None])
+        U, V = model.vb(Abs, Aws, w), model.vw(Abs, Aws, w)
+        norm = np.hypot(U, V)
+        outside = (Abs + Aws > 1 + 1e-12) | (norm == 0)
+        U = np.ma.array(U / np.where(norm == 0, 1, norm), mask=np.broadcast_to(outside, U.shape))
+        V = np.ma.array(V / np.where(norm == 0, 1, norm), mask=U.mask)
+        index, points, stable = _sweep(sweep.equilibria2d(world, Ls, workers=1, nTestvec=6))
+        return Abs, Aws, U, V, index, points, stable
 
     def drawBackground(self):
-        self.axes[0].set_title("L = {:.03f}".format(self.evolution.L.value))
-        Aws, Abs = np.mgrid[0:1:100j, 0:1:100j]
-        vbs = self.vb(Abs, Aws)
-        vws = self.vw(Abs, Aws)
-        mask = np.zeros(vws.shape, dtype=bool)
-        for i in range(len(vws)):
-            vws[i, len(vws) - i:] = np.nan
-            vws = np.ma.array(vws, mask=mask)
-        self.axes[0].streamplot(Abs, Aws, vbs, vws, color="#8080ff", density=1.5)
-        
-        def _cost(A):
-            return self.vb(A[0], A[1]) ** 2 + self.vw(A[0], A[1]) ** 2
-        self.fixedPoints = []
-        xtol = 1e-5
-        ctol = 1e-7
-        testvec = np.linspace(0, 1, num=6)
-        for Ab0 in testvec:
-            for Aw0 in testvec:
-                if (Ab0 + Aw0) <= 1:
-                    A0 = np.array([Ab0, Aw0])
-                    res = minimize(_cost, A0, method="nelder-mead", options={'xtol': xtol})
-                    pb = round(res.x[0], 5)
-                    pw = round(res.x[1], 5)
-                    if ([pb, pw] not in [fps.coords for fps in self.fixedPoints]) and ((pb + pw) <= 1) and (pb >= 0) and (pw >= 0) and (_cost([pb, pw]) < ctol):
-                        fp = FixedPoint([pb, pw])
-                        fp.stable = self._JacobianStability(fp)
-                        self.fixedPoints.append(fp)
-        for fp in self.fixedPoints:
-            self.axes[0].plot(fp.coords[0], fp.coords[1], "b^" if fp.stable else "rv", markersize=12, clip_on=False)
-            self.axes[1].plot(fp.coords[0], fp.coords[1], self.evolution.L.value, "b^" if fp.stable else "rv", markersize=12, clip_on=False)
+        Abs, Aws, U, V, index, points, stable = self.background
+        for mask, style in ((stable, "b^"), (~stable, "rv")):
+            self.axes[1].plot(points[mask, 0], points[mask, 1], self.Ls[index[mask]], style, alpha=0.3, clip_on=False)
         
         self.axes[0].set_xlabel("Time ($t$)")
         self.axes[0].set_ylabel("Daisy Area ($A$)")
@@ -615,12 +929,31 @@ class Bifurcation2(Module):
         self.axes[1].set_ylim(0, 1)
         self.axes[1].set_zlim(self.parameters.Lmin.value, self.parameters.Lmax.value)
 
+    def initForeground(self):
+        Abs, Aws, U, V, index, points, stable = self.background
+        self.field = self.axes[0].quiver(Abs, Aws, U[0], V[0], color="#8080ff", pivot="mid", scale=30)
+        self.marks = [self.axes[0].plot([], [], style, markersize=12, clip_on=False)[0] for style in ("b^", "rv")]
+        self.current = [self.axes[1].plot([], [], [], style, markersize=12, clip_on=False)[0] for style in ("b^", "rv")]
+        self.drawForeground()
+        return [self.field, self.axes[0].title] + self.marks + self.current
+
+    def resetForeground(self):
+        return self.drawForeground()
+
     def drawForeground(self):
-        if self.evolution.L.value <= self.parameters.Lmax.value:
-            self.axes[0].cla()
-            self.drawBackground()
+        Abs, Aws, U, V, index, points, stable = self.background
+        L = self.Ls[self.index]
+        self.axes[0].set_title("L = {:.03f}".format(L))
+        self.field.set_UVC(U[self.index], V[self.index])
+        here = index == self.index
+        self.fixedPoints = [FixedPoint([float(c) for c in p], bool(s)) for p, s in zip(points[here], stable[here])]
+        for marks, current, mask in zip(self.marks, self.current, (here & stable, here & ~stable)):
+            marks.set_data(points[mask, 0], points[mask, 1])
+            current.set_data_3d(points[mask, 0], points[mask, 1], np.full(mask.sum(), L))
+        return False
 
     def generateFigure(self, width, height, dpi):
+        from matplotlib.figure import Figure
         self.axes = []
         fig = Figure(figsize=(width, height), dpi=dpi)
         self.axes.append(fig.add_subplot(121))
@@ -628,24 +961,70 @@ class Bifurcation2(Module):
         # self.axes[1].view_init(elev=0, azim=0)
         return fig
 
-    def _JacobianStability(self, fixedPoint):
-        def partial_derivative(v, coords, idx):
-            args = coords[:]
-            def wraps(x):
-                args[idx] = x
-                return v(*args)
-            return derivative(wraps, coords[idx], dx=1e-5)
-
-        j00 = partial_derivative(self.vb, fixedPoint.coords, 0)
-        j01 = partial_derivative(self.vb, fixedPoint.coords, 1)
-        j10 = partial_derivative(self.vw, fixedPoint.coords, 0)
-        j11 = partial_derivative(self.vw, fixedPoint.coords, 1)
-        jacobian = np.array([[j00, j01], [j10, j11]])
-        eigval, _ = np.linalg.eig(jacobian)
-        return (eigval[0] < 0 and eigval[1] < 0)
+def _luminosities(parameters):
+    return np.arange(parameters.Lmin.value, parameters.Lmax.value + parameters.dL.value / 2, parameters.dL.value)
+
+# Fixed points at every luminosity, flattened to (luminosity index, coordinates, stability) arrays
+def _sweep(fixedPointsList):
+    index, points, stable = [], [], []
+    for i, fixedPoints in enumerate(fixedPointsList):
+        for p, isStable in fixedPoints.items():
+            index.append(i)
+            points.append(p)
+            stable.append(isStable)
+    return np.array(index, dtype=int), np.array(points, dtype=float), np.array(stable, dtype=bool)
+
+def _padded(values, margin=0.05):
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    return lo - margin * (hi - lo), hi + margin * (hi - lo)
+
+# Doubles the time axis once t reaches its end; True if the axes need a full redraw
+def _extendTimeAxis(ax, t):
+    tmin, tmax = ax.get_xlim()
+    if t < tmax:
+        return False
+    while t >= tmax:
+        tmax = tmin + 2 * (tmax - tmin)
+    ax.set_xlim(tmin, tmax)
+    return True
+
+# Streamlines and equilibria of the Two-Daisy World. Axes.streamplot spends most
+# of its time integrating streamlines, so it runs on a private figure that no
+# canvas shows, which is safe off the main thread; only the line vertices are kept,
+# and they are kept on disk too, so the next session starts without the wait.
+@cache.persistent()
+def _stateSpace(world, nTestvec):
+    from matplotlib.figure import Figure
+    Aws, Abs = np.mgrid[0:1:100j, 0:1:100j]
+    vbs, vws = model.rates2d(Abs, Aws, world)
+    mask = np.zeros(vws.shape, dtype=bool)
+    for i in range(len(vws)):
+        vws[i, len(vws) - i:] = np.nan
+        vws = np.ma.array(vws, mask=mask)
+    stream = Figure().add_subplot().streamplot(Abs, Aws, vbs, vws, density=1.5)
+    lines = [np.asarray(line) for line in stream.lines.get_segments() if len(line) > 1]
+    return lines, equilibria.fixedPoints2d(world, nTestvec=nTestvec)
+
+# Draws the streamlines as Axes.streamplot would: one collection, an arrow halfway along each line
+def _drawStreamlines(ax, lines, color):
+    from matplotlib import rcParams
+    from matplotlib.collections import LineCollection
+    from matplotlib.patches import FancyArrowPatch
+    ax.add_collection(LineCollection(lines, color=color, linewidth=rcParams["lines.linewidth"]))
+    for points in lines:
+        s = np.cumsum(np.hypot(*np.diff(points, axis=0).T))
+        i = np.searchsorted(s, s[-1] / 2)
+        ax.add_patch(FancyArrowPatch(points[i], points[i:i + 2].mean(axis=0), arrowstyle="-|>", mutation_scale=10,
+                                     color=color, linewidth=rcParams["lines.linewidth"]))
+    ax.autoscale_view()
 
 if __name__ == "__main__":
+    _timing("imported")
     app = qtw.QApplication(sys.argv)
     window = MainWindow()
+    _timing("window built")
     window.show()
-    sys.exit(app.exec_())
+    _timing("window shown")
+    status = app.exec_()
+    qtc.QThreadPool.globalInstance().waitForDone()  # let running background computations finish
+    sys.exit(status)
@@ -0,0 +1,165 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+from collections import namedtuple
+import numpy as np
+import integrate
+import model
+import sweep
+
+# Monte Carlo ensembles over uncertain parameters. Each member draws its
+# parameters (and, if given a distribution, its initial areas) and the members
+# are integrated in batches of batchsize at once, with the parameter record
+# holding one value per member. Every batch is reduced straight away into
+# running statistics per sampled time, so memory depends on batchsize, the
+# number of times and the histogram bins, never on the ensemble size n.
+#
+# distributions maps parameter names (model record fields, or A0 / Ab0 / Aw0)
+# to a distribution below or a fixed value; other parameters come from world.
+# Initial areas are clipped onto the physical range (see _clipAreas).
+# Batches are seeded from seed through np.random.SeedSequence, so a run gives
+# the same numbers whatever the number of workers. Batches run on a process
+# pool through sweep.stream.
+#
+#   stats = ensemble.ensemble1d(model.World1(), {"L": ensemble.Uniform(0.8, 1.2)}, 10 ** 6, np.linspace(0, 50, 101))
+#   stats["A"].mean, stats["A"].quantile(0.95), stats["A"].surviving()
+
+Uniform = namedtuple("Uniform", ["lo", "hi"])
+Normal = namedtuple("Normal", ["mean", "sd", "lo", "hi"], defaults=[-np.inf, np.inf])  # clipped to [lo, hi]
+Choice = namedtuple("Choice", ["values"])
+
+def sample(distribution, rng, n):
+    if isinstance(distribution, Uniform):
+        return rng.uniform(distribution.lo, distribution.hi, n)
+    if isinstance(distribution, Normal):
+        return np.clip(rng.normal(distribution.mean, distribution.sd, n), distribution.lo, distribution.hi)
+    if isinstance(distribution, Choice):
+        return rng.choice(np.asarray(distribution.values, dtype=float), n)
+    return np.full(n, float(distribution))
+
+# Running statistics of a quantity (a daisy area) at nTimes sampled times.
+# Mean and variance are merged between batches with Chan's parallel update;
+# quantiles come from a histogram sketch with bins equal bins on [lo, hi]
+# (the areas are bounded, so the sketch is accurate to (hi - lo) / bins);
+# surviving() is the fraction of members above threshold.
+class Statistics:
+    def __init__(self, nTimes, bins=1000, lo=0., hi=1., threshold=1e-3):
+        self.bins, self.lo, self.hi, self.threshold = bins, lo, hi, threshold
+        self.count = 0
+        self.mean = np.zeros(nTimes)
+        self.m2 = np.zeros(nTimes)  # sum of squared deviations from the mean
+        self.histogram = np.zeros((nTimes, bins), dtype=np.int64)
+        self.alive = np.zeros(nTimes, dtype=np.int64)
+
+    def add(self, x):  # x of shape (nTimes, nMembers)
+        batch = Statistics(len(self.mean), self.bins, self.lo, self.hi, self.threshold)
+        batch.count = x.shape[1]
+        batch.mean = x.mean(axis=1)
+        batch.m2 = ((x - batch.mean[:, None]) ** 2).sum(axis=1)
+        index = np.clip(((x - self.lo) / (self.hi - self.lo) * self.bins).astype(np.int64), 0, self.bins - 1)
+        index += np.arange(len(x))[:, None] * self.bins  # one histogram per time
+        batch.histogram = np.bincount(index.ravel(), minlength=self.histogram.size).reshape(self.histogram.shape)
+        batch.alive = (x > self.threshold).sum(axis=1)
+        self.merge(batch)
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / count)
+        self.histogram += other.histogram
+        self.alive += other.alive
+        self.count = count
+
+    def variance(self):
+        return self.m2 / max(self.count - 1, 1)
+
+    def std(self):
+        return np.sqrt(self.variance())
+
+    def quantile(self, q):  # per time, interpolated linearly within a bin
+        cumulative = np.cumsum(self.histogram, axis=1) / max(self.count, 1)
+        edges = np.linspace(self.lo, self.hi, self.bins + 1)
+        result = np.empty(len(cumulative))
+        for i, c in enumerate(cumulative):
+            j = min(np.searchsorted(c, q), self.bins - 1)
+            below = c[j - 1] if j else 0.
+            inBin = c[j] - below
+            result[i] = edges[j] + (edges[j + 1] - edges[j]) * ((q - below) / inBin if inBin > 0 else 0.)
+        return result
+
+    def surviving(self):
+        return self.alive / max(self.count, 1)
+
+def ensemble1d(world, distributions, n, times, A0=0.5, batchsize=10000, seed=0, bins=1000, threshold=1e-3,
+               workers=None, progress=None):
+    tasks = _tasks(world, dict({"A0": A0}, **distributions), n, times, batchsize, seed, bins, threshold)
+    return _reduce(_batch1d, tasks, ["A"], len(times), bins, threshold, workers, progress)
+
+def ensemble2d(world, distributions, n, times, Ab0=0.3, Aw0=0.4, batchsize=10000, seed=0, bins=1000, threshold=1e-3,
+               workers=None, progress=None):
+    tasks = _tasks(world, dict({"Ab0": Ab0, "Aw0": Aw0}, **distributions), n, times, batchsize, seed, bins, threshold)
+    return _reduce(_batch2d, tasks, ["Ab", "Aw"], len(times), bins, threshold, workers, progress)
+
+def _tasks(world, distributions, n, times, batchsize, seed, bins, threshold):
+    unknown = set(distributions) - set(world._fields) - {"A0", "Ab0", "Aw0"}
+    if unknown:
+        raise ValueError("Unknown parameters for {}: {}".format(type(world).__name__, ", ".join(sorted(unknown))))
+    sizes = [min(batchsize, n - start) for start in range(0, n, batchsize)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    times = np.asarray(times, dtype=float)
+    return [(world, distributions, size, s, times, bins, threshold) for size, s in zip(sizes, seeds)], len(sizes)
+
+def _reduce(func, tasks, names, nTimes, bins, threshold, workers, progress):
+    tasks, total = tasks
+    stats = {name: Statistics(nTimes, bins, threshold=threshold) for name in names}
+    for batch in sweep.stream(func, tasks, workers=workers, progress=progress, total=total):
+        for name, s in zip(names, batch):
+            stats[name].merge(s)
+    return stats
+
+def _draw(task, rates):  # the batch's parameter record, with one value per member, and its initial areas
+    world, distributions, size, seed = task[:4]
+    rng = np.random.default_rng(seed)
+    values = {name: sample(d, rng, size) for name, d in sorted(distributions.items())}
+    _clipAreas(values)
+    w = world._replace(**{f: values[f] for f in world._fields if f in values})
+    with np.errstate(invalid="ignore"):
+        if not np.all(np.isfinite(rates(w, values))):  # the integrator would never find a valid step
+            raise ValueError("Sampled parameters give non-finite rates; restrict the distributions to physical values")
+    return w, values
+
+# Initial areas drawn outside the physical range, e.g. from an unbounded Normal,
+# are moved onto it: A0 into [0, 1], and Ab0, Aw0 to at least 0 and scaled down
+# onto Ab + Aw = 1 where they cover more than the planet. Outside it the rates
+# are not finite and the whole batch would fail for one member.
+def _clipAreas(values):
+    if "A0" in values:
+        values["A0"] = np.clip(values["A0"], 0, 1)
+    if "Ab0" in values and "Aw0" in values:
+        Ab, Aw = np.maximum(values["Ab0"], 0), np.maximum(values["Aw0"], 0)
+        total = np.maximum(Ab + Aw, 1)
+        values["Ab0"], values["Aw0"] = Ab / total, Aw / total
+
+def _batch1d(task):
+    times, bins, threshold = task[4:]
+    w, values = _draw(task, lambda w, values: model.v(values["A0"], w))
+    _, areas, _ = integrate.adaptive1d(lambda A: model.v(A, w), values["A0"], tmax=max(times), times=times)
+    stats = Statistics(len(times), bins, threshold=threshold)
+    stats.add(areas)
+    return (stats,)
+
+def _batch2d(task):
+    times, bins, threshold = task[4:]
+    w, values = _draw(task, lambda w, values: model.vb(values["Ab0"], values["Aw0"], w) + model.vw(values["Ab0"], values["Aw0"], w))
+    _, black, white, _ = integrate.adaptive2d(lambda Ab, Aw: model.vb(Ab, Aw, w), lambda Ab, Aw: model.vw(Ab, Aw, w),
+                                              values["Ab0"], values["Aw0"], tmax=max(times), times=times)
+    result = []
+    for areas in (black, white):
+        stats = Statistics(len(times), bins, threshold=threshold)
+        stats.add(areas)
+        result.append(stats)
+    return tuple(result)
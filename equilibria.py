@@ -0,0 +1,167 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import numpy as np
+import cache
+import model
+
+# Fixed points of dA/dt = v(A) on 0 <= A <= 1, returned as {A: isStable}.
+# v is evaluated once on a grid; every sign change is a bracket that Brent's
+# method polishes, A = 0 is always a root, and roots that touch zero without
+# crossing it (at a fold) are caught as near-zero local minima of |v|. Stability
+# comes from derivative(A) = dv/dA if it is given (vectorized, e.g. from
+# model.derivatives1d), else from a central difference of width 2 * dA.
+def equilibrium1d(v, nGrid=101, dA=1e-5, ctol=1e-7, xtol=1e-12, derivative=None):
+    from scipy.optimize import brentq, minimize_scalar  # slow to import, and only needed here
+    def _cost(A):
+        return v(A) ** 2
+    As = np.linspace(0, 1, num=nGrid)
+    vs = v(As)
+    roots = [0.]
+    for i in range(nGrid - 1):
+        if vs[i + 1] == 0:
+            roots.append(As[i + 1])
+        elif vs[i] * vs[i + 1] < 0:
+            roots.append(brentq(v, As[i], As[i + 1], xtol=xtol))
+    avs = np.abs(vs)
+    for i in range(1, nGrid - 1):
+        if (avs[i] <= avs[i - 1]) and (avs[i] <= avs[i + 1]) and (vs[i - 1] * vs[i + 1] > 0):
+            res = minimize_scalar(_cost, bounds=(As[i - 1], As[i + 1]), method="bounded", options={"xatol": xtol})
+            if res.fun < ctol:
+                roots.append(res.x)
+    keys, found = [], []
+    for r in sorted(roots):
+        p = round(float(r), 5)
+        if (p not in keys) and (0 <= p <= 1):
+            keys.append(p)
+            found.append(r)
+    found = np.array(found)
+    if derivative is None:
+        slopes = (v(found + dA) - v(found - dA)) / (2 * dA)
+    else:
+        slopes = derivative(found)
+    _, kinds = classify1d(slopes)
+    return dict(zip(keys, isStable(kinds).tolist()))
+
+# Fixed points of (dAb/dt, dAw/dt) = (vb, vw) on the simplex Ab, Aw >= 0, Ab + Aw <= 1,
+# returned as {(Ab, Aw): isStable}. Newton's method runs from every seed of an
+# nTestvec-by-nTestvec grid at once; jacobian(Ab, Aw) must return the closed-form
+# partial derivatives (j00, j01, j10, j11) as arrays. Steps are damped by halving
+# until the residual decreases and are projected back onto the simplex; seeds
+# that cannot descend any further are dropped unless their residual is below ctol.
+def equilibrium2d(vb, vw, jacobian, nTestvec=21, ctol=1e-7, xtol=1e-10, maxiter=50, nHalvings=8):
+    def _residual(Ab, Aw):
+        return vb(Ab, Aw) ** 2 + vw(Ab, Aw) ** 2
+    Aws, Abs = np.mgrid[0:1:nTestvec * 1j, 0:1:nTestvec * 1j]
+    inside = (Abs + Aws) <= 1 + 1e-12
+    Ab, Aw = Abs[inside], Aws[inside]
+    active = np.ones(Ab.shape, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(maxiter):
+            if not active.any():
+                break
+            b, w = Ab[active], Aw[active]
+            fb, fw = vb(b, w), vw(b, w)
+            j00, j01, j10, j11 = jacobian(b, w)
+            det = j00 * j11 - j01 * j10
+            db = -(j11 * fb - j01 * fw) / det
+            dw = -(-j10 * fb + j00 * fw) / det
+            res = fb ** 2 + fw ** 2
+            scale = np.ones(b.shape)
+            nb, nw = _project(b + db, w + dw)
+            newres = _residual(nb, nw)
+            for _ in range(nHalvings):
+                worse = ~(newres < res)
+                if not worse.any():
+                    break
+                scale[worse] /= 2
+                nb[worse], nw[worse] = _project(b[worse] + scale[worse] * db[worse], w[worse] + scale[worse] * dw[worse])
+                newres[worse] = _residual(nb[worse], nw[worse])
+            step = np.abs(nb - b) + np.abs(nw - w)
+            Ab[active], Aw[active] = nb, nw
+            idx = np.flatnonzero(active)  # stop seeds that converged or can no longer descend
+            active[idx[~np.isfinite(step) | (step < xtol) | ~(newres < res)]] = False
+    ok = np.isfinite(Ab) & np.isfinite(Aw)
+    Ab, Aw = Ab[ok], Aw[ok]
+    ok = _residual(Ab, Aw) < ctol
+    points = _cluster(Ab[ok], Aw[ok])
+    fixedPoints = {}
+    if len(points):
+        _, kinds = classify2d(*jacobian(points[:, 0], points[:, 1]))
+        for (pb, pw), stable in zip(points, isStable(kinds)):
+            fixedPoints[(round(float(pb), 5), round(float(pw), 5))] = bool(stable)
+    return fixedPoints
+
+# Linear stability of many fixed points in one call. classify1d takes dv/dA and
+# classify2d the Jacobian entries (j00, j01, j10, j11), as arrays over the fixed
+# points; both return the eigenvalues (shape (n,) or (n, 2), complex in 2D) and
+# the kind of each fixed point from the trace/determinant plane. Eigenvalues
+# within tol of the imaginary axis make a fixed point non-hyperbolic, where the
+# linearization cannot decide its stability (e.g. at a fold).
+STABLE_NODE, UNSTABLE_NODE, SADDLE = "stable node", "unstable node", "saddle"
+STABLE_SPIRAL, UNSTABLE_SPIRAL, CENTER, NON_HYPERBOLIC = "stable spiral", "unstable spiral", "center", "non-hyperbolic"
+
+def classify1d(dvdA, tol=1e-12):
+    dvdA = np.asarray(dvdA, dtype=float)
+    kinds = np.where(dvdA < -tol, STABLE_NODE, np.where(dvdA > tol, UNSTABLE_NODE, NON_HYPERBOLIC))
+    return dvdA, kinds
+
+def classify2d(j00, j01, j10, j11, tol=1e-12):
+    j00, j01, j10, j11 = np.broadcast_arrays(*(np.asarray(j, dtype=float) for j in (j00, j01, j10, j11)))
+    trace = j00 + j11
+    det = j00 * j11 - j01 * j10
+    root = np.sqrt((trace ** 2 - 4 * det).astype(complex))
+    eigenvalues = np.stack([(trace + root) / 2, (trace - root) / 2], axis=-1)
+    spiral = trace ** 2 - 4 * det < 0
+    kinds = np.select([det < -tol, np.abs(det) <= tol, spiral & (np.abs(trace) <= tol),
+                       trace < -tol, trace > tol],
+                      [SADDLE, NON_HYPERBOLIC, CENTER,
+                       np.where(spiral, STABLE_SPIRAL, STABLE_NODE), np.where(spiral, UNSTABLE_SPIRAL, UNSTABLE_NODE)],
+                      default=NON_HYPERBOLIC)
+    return eigenvalues, kinds
+
+def isStable(kinds):  # every eigenvalue has a negative real part
+    return np.isin(kinds, [STABLE_NODE, STABLE_SPIRAL])
+
+# Closed-form stability of fixed points of a model.World1 / model.World2 record,
+# (eigenvalues, kinds) as from classify1d / classify2d
+def stability1d(A, world):
+    return classify1d(model.derivatives1d(A, world)[0])
+
+def stability2d(Ab, Aw, world):
+    return classify2d(*model.jacobian2d(Ab, Aw, world))
+
+# Fixed points and their stability for a model.World1 / model.World2 record,
+# memoized on the record and the solver settings, so that repeated sweeps over
+# the same parameters are served from memory. Each call returns a fresh dict.
+@cache.lru(maxsize=8192, maxbytes=16 * 2 ** 20, copy=dict)
+def fixedPoints1d(world, nGrid=101, ctol=1e-7, xtol=1e-12):
+    return equilibrium1d(lambda A: model.v(A, world), nGrid=nGrid, ctol=ctol, xtol=xtol,
+                         derivative=lambda A: model.derivatives1d(A, world)[0])
+
+@cache.lru(maxsize=8192, maxbytes=16 * 2 ** 20, copy=dict)
+def fixedPoints2d(world, nTestvec=21, ctol=1e-7, xtol=1e-10, maxiter=50, nHalvings=8):
+    return equilibrium2d(lambda Ab, Aw: model.vb(Ab, Aw, world),
+                         lambda Ab, Aw: model.vw(Ab, Aw, world),
+                         lambda Ab, Aw: model.jacobian2d(Ab, Aw, world),
+                         nTestvec=nTestvec, ctol=ctol, xtol=xtol, maxiter=maxiter, nHalvings=nHalvings)
+
+def _project(Ab, Aw):
+    Ab, Aw = np.maximum(Ab, 0), np.maximum(Aw, 0)
+    excess = np.maximum(Ab + Aw - 1, 0) / 2
+    Ab, Aw = Ab - excess, Aw - excess
+    over = Ab < 0
+    Aw = np.where(over, 1., Aw)
+    Ab = np.where(over, 0., Ab)
+    over = Aw < 0
+    Ab = np.where(over, 1., Ab)
+    Aw = np.where(over, 0., Aw)
+    return Ab, Aw
+
+def _cluster(Ab, Aw, tol=1e-6):
+    points = []
+    for p in zip(Ab, Aw):
+        if all(abs(p[0] - q[0]) + abs(p[1] - q[1]) > tol for q in points):
+            points.append(p)
+    return np.array(sorted(points))
@@ -0,0 +1,100 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import numpy as np
+
+# Bounded history of a trajectory for plotting, in constant memory however long
+# the run. The latest capacity points are kept exactly in a ring buffer. Older
+# points are folded into at most capacity buckets, each keeping only the points
+# with the smallest and largest coordinate `key` (min/max decimation); when the
+# buckets run out, neighbours merge pairwise and every bucket covers twice as many
+# steps as before. The coarse envelope of the whole run plus the recent detail is
+# therefore never more than about 3 * capacity vertices.
+class History:
+    def __init__(self, nDims, capacity=1024, key=-1):
+        self.nDims = nDims
+        self.capacity = capacity
+        self.key = 1 + (key % nDims)  # column 0 holds the step number
+        self.ring = np.empty((capacity, nDims + 1))
+        self.head = 0  # oldest point in the ring
+        self.size = 0
+        self.buckets = np.empty((capacity, 2, nDims + 1))  # (lowest, highest) point of each bucket
+        self.nBuckets = 0
+        self.bucketSize = 1
+        self.pending = None  # the bucket being filled, as (lowest, highest, count)
+        self.nSteps = 0
+
+    def __len__(self):
+        return self.nSteps
+
+    def append(self, *coords):  # one point, or several given as arrays
+        points = np.column_stack([np.atleast_1d(np.asarray(c, dtype=float)) for c in coords])
+        points = np.column_stack([self.nSteps + np.arange(len(points)), points])
+        self.nSteps += len(points)
+        if len(points) > self.capacity:
+            self._fold(points[:-self.capacity])
+            points = points[-self.capacity:]
+        overflow = self.size + len(points) - self.capacity
+        if overflow > 0:
+            self._fold(self.ring[(self.head + np.arange(overflow)) % self.capacity])
+            self.head = (self.head + overflow) % self.capacity
+            self.size -= overflow
+        self.ring[(self.head + self.size + np.arange(len(points))) % self.capacity] = points
+        self.size += len(points)
+
+    def vertices(self):  # nDims arrays, in step order
+        parts = [self.buckets[:self.nBuckets].reshape(-1, self.nDims + 1)]
+        if self.pending is not None:
+            parts.append(np.array(self.pending[:2]))
+        parts.append(self.ring[(self.head + np.arange(self.size)) % self.capacity])
+        points = np.concatenate(parts)
+        _, first = np.unique(points[:, 0], return_index=True)  # sorts by step; a bucket's min may be its max
+        return tuple(points[first, 1:].T)
+
+    def clear(self):
+        self.__init__(self.nDims, self.capacity, self.key - 1)
+
+    def _fold(self, points):
+        k = self.key
+        while len(points):
+            if self.pending is not None:
+                lo, hi, count = self.pending
+                n = min(self.bucketSize - count, len(points))
+                chunk = points[:n]
+                lo = min(lo, chunk[np.argmin(chunk[:, k])], key=lambda p: p[k])
+                hi = max(hi, chunk[np.argmax(chunk[:, k])], key=lambda p: p[k])
+                points = points[n:]
+                self.pending = (lo, hi, count + n)
+                if count + n == self.bucketSize:
+                    self.pending = None
+                    self._push(np.array([[lo, hi]]))
+                continue
+            if self.nBuckets == self.capacity:
+                self._merge()
+            nFull = min(len(points) // self.bucketSize, self.capacity - self.nBuckets)
+            if nFull:
+                full = points[:nFull * self.bucketSize].reshape(nFull, self.bucketSize, -1)
+                rows = np.arange(nFull)
+                self._push(np.stack([full[rows, np.argmin(full[:, :, k], axis=1)],
+                                     full[rows, np.argmax(full[:, :, k], axis=1)]], axis=1))
+                points = points[nFull * self.bucketSize:]
+            elif len(points):  # less than one bucket left: start filling a new one
+                self.pending = (points[0], points[0], 1)
+                points = points[1:]
+
+    def _push(self, buckets):
+        if self.nBuckets == self.capacity:
+            self._merge()
+        self.buckets[self.nBuckets:self.nBuckets + len(buckets)] = buckets
+        self.nBuckets += len(buckets)
+
+    def _merge(self):  # halve the resolution of the folded history
+        k = self.key
+        pairs = self.buckets[:self.nBuckets].reshape(-1, 2, 2, self.nDims + 1)  # (pair, bucket, lo/hi, coords)
+        rows = np.arange(len(pairs))
+        lo = pairs[rows, np.argmin(pairs[:, :, 0, k], axis=1), 0]
+        hi = pairs[rows, np.argmax(pairs[:, :, 1, k], axis=1), 1]
+        self.nBuckets = len(pairs)
+        self.buckets[:self.nBuckets] = np.stack([lo, hi], axis=1)
+        self.bucketSize *= 2
@@ -0,0 +1,143 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import numpy as np
+
+# Forward-Euler trajectories for many initial conditions at once.
+# Every trajectory is advanced in lockstep as one NumPy array, so v, vb and vw
+# must accept arrays (the Daisyworld rate functions already do).
+# Returns time of shape (nSteps,) and areas of shape (nSteps, nTraj);
+# a scalar initial condition gives areas of shape (nSteps,) instead.
+
+def euler1d(v, A0, dt=0.025, tmax=10):
+    time = np.arange(0, tmax, dt)
+    A = np.array(A0, dtype=float).reshape(-1)
+    areas = np.empty((len(time), len(A)))
+    for i in range(len(time)):
+        areas[i] = A
+        A += v(A) * dt
+    if np.ndim(A0) == 0:
+        areas = areas[:, 0]
+    return time, areas
+
+def euler2d(vb, vw, Ab0, Aw0, dt=0.05, tmax=10):
+    time = np.arange(0, tmax, dt)
+    Ab = np.array(Ab0, dtype=float).reshape(-1)
+    Aw = np.array(Aw0, dtype=float).reshape(-1)
+    Ab, Aw = np.broadcast_arrays(Ab, Aw)
+    Ab, Aw = Ab.copy(), Aw.copy()
+    black_areas = np.empty((len(time), len(Ab)))
+    white_areas = np.empty((len(time), len(Aw)))
+    for i in range(len(time)):
+        black_areas[i] = Ab
+        white_areas[i] = Aw
+        Ab += vb(Ab, Aw) * dt
+        Aw += vw(Ab, Aw) * dt  # uses the updated Ab, as in the scripts
+    if np.ndim(Ab0) == 0 and np.ndim(Aw0) == 0:
+        black_areas, white_areas = black_areas[:, 0], white_areas[:, 0]
+    return time, black_areas, white_areas
+
+# Adaptive Dormand-Prince 5(4) trajectories. Each step is accepted when the
+# embedded 4th-order estimate of its error is below atol + rtol * |A| for every
+# trajectory, and the next step size is chosen from that estimate. Integration
+# stops at tmax, or earlier once |dA/dt| < steady for every trajectory (they have
+# settled on an equilibrium; steady should not be much below rtol, since the
+# accepted states only settle to within the error tolerance). Returns the
+# accepted times, the areas there, and a function giving the areas at any times
+# (cubic Hermite dense output, holding the final areas after the stop). Pass
+# times to get the areas sampled there instead; they are held after tmax too, so
+# pass a tmax that covers them. maxSteps bounds the attempted steps, rejected
+# ones included; rates that are not finite at the initial areas, or a step size
+# that underflows because every trial step runs into them, raise
+# FloatingPointError.
+
+def adaptive1d(v, A0, tmax=10, times=None, rtol=1e-6, atol=1e-9, steady=1e-6, h0=0.01, maxSteps=100000):
+    A = np.array(A0, dtype=float).reshape(1, -1)
+    time, ys, fs = _dopri(lambda y: v(y[0])[None], A, tmax, rtol, atol, steady, h0, maxSteps)
+    scalar = np.ndim(A0) == 0
+    def dense(t):
+        areas = _hermite(time, ys, fs, t)[..., 0, :]
+        return areas[..., 0] if scalar else areas
+    if times is not None:
+        return np.asarray(times), dense(times), dense
+    return time, dense(time), dense
+
+def adaptive2d(vb, vw, Ab0, Aw0, tmax=10, times=None, rtol=1e-6, atol=1e-9, steady=1e-6, h0=0.01, maxSteps=100000):
+    Ab, Aw = np.broadcast_arrays(np.array(Ab0, dtype=float).reshape(-1), np.array(Aw0, dtype=float).reshape(-1))
+    time, ys, fs = _dopri(lambda y: np.array([vb(y[0], y[1]), vw(y[0], y[1])]),
+                          np.array([Ab, Aw]), tmax, rtol, atol, steady, h0, maxSteps)
+    scalar = np.ndim(Ab0) == 0 and np.ndim(Aw0) == 0
+    def dense(t):
+        areas = _hermite(time, ys, fs, t)
+        black_areas, white_areas = areas[..., 0, :], areas[..., 1, :]
+        if scalar:
+            black_areas, white_areas = black_areas[..., 0], white_areas[..., 0]
+        return black_areas, white_areas
+    if times is None:
+        times = time
+    return (np.asarray(times),) + dense(times) + (dense,)
+
+# Dormand-Prince tableau; _B5 gives the solution, _E the difference to the 4th-order one
+_C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1])
+_A = [[],
+      [1 / 5],
+      [3 / 40, 9 / 40],
+      [44 / 45, -56 / 15, 32 / 9],
+      [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+      [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656]]
+_B5 = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0])
+_E = _B5 - np.array([5179 / 57600, 0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+def _dopri(f, y, tmax, rtol, atol, steady, h, maxSteps):
+    t = 0.
+    k = f(y)
+    if not np.all(np.isfinite(k)):
+        raise FloatingPointError("Rates are not finite at the initial areas")
+    time, ys, fs = [t], [y.copy()], [k]
+    nSteps = 0  # accepted and rejected, so a step that keeps failing still ends
+    while t < tmax and nSteps < maxSteps and not np.max(np.abs(k)) < steady:
+        nSteps += 1
+        h = min(h, tmax - t)
+        if h < 1e-12 * tmax:
+            raise FloatingPointError("Step size underflow at t = {:g}; the rates are not finite nearby".format(t))
+        yNew, kNew, err = step54(f, y, k, h)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(yNew))
+        error = np.max(np.abs(err) / scale)
+        if not np.isfinite(error):
+            h /= 5
+            continue
+        if error <= 1:
+            t, y, k = t + h, yNew, kNew
+            time.append(t)
+            ys.append(y.copy())
+            fs.append(k)
+        h *= min(5, max(0.2, 0.9 * error ** -0.2)) if error > 0 else 5
+    return np.array(time), np.array(ys), np.array(fs)
+
+# One Dormand-Prince 5(4) step from the states y, whose derivatives are k = f(y).
+# h may be an array that broadcasts against y, giving every state its own step
+# size. Returns the new states, their derivatives (the 7th stage, reused as the
+# first stage of the next step) and the embedded error estimate.
+def step54(f, y, k, h):
+    ks = [k]
+    for i in range(1, 6):
+        ks.append(f(y + h * sum(a * kj for a, kj in zip(_A[i], ks))))
+    yNew = y + h * sum(b * kj for b, kj in zip(_B5, ks))
+    kNew = f(yNew)
+    ks.append(kNew)
+    err = h * sum(e * kj for e, kj in zip(_E, ks))
+    return yNew, kNew, err
+
+# Cubic Hermite interpolation from the states and derivatives at the step ends
+def _hermite(time, ys, fs, t):
+    t = np.asarray(t, dtype=float)
+    tc = np.clip(t, time[0], time[-1])
+    i = np.clip(np.searchsorted(time, tc, side="right") - 1, 0, max(len(time) - 2, 0))
+    if len(time) == 1:
+        return np.broadcast_to(ys[0], t.shape + ys.shape[1:]).copy()
+    h = (time[i + 1] - time[i]).reshape(t.shape + (1,) * (ys.ndim - 1))
+    s = (tc - time[i]).reshape(h.shape) / h
+    y0, y1, f0, f1 = ys[i], ys[i + 1], fs[i], fs[i + 1]
+    return ((1 + 2 * s) * (1 - s) ** 2 * y0 + s * (1 - s) ** 2 * h * f0
+            + s ** 2 * (3 - 2 * s) * y1 + s ** 2 * (s - 1) * h * f1)
@@ -0,0 +1,138 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+
+# Closed-form Daisyworld equations. Every function is pure: the parameters come
+# in as an immutable World1 / World2 record, never from globals, so the same
+# call can run concurrently in threads or processes. Equal parameter sets
+# compare and hash equally, so records can key caches. Use world._replace(L=...)
+# to vary a parameter.
+
+# Parameters of the One-Daisy World
+World1 = namedtuple("World1", ["L", "ai", "ag", "R", "S", "sigma", "Ti", "gamma"],
+                    defaults=[1., 0.75, 0.5, 0.2, 917., 5.67e-8, 22.5, 0.3])
+
+# Parameters of the Two-Daisy World
+World2 = namedtuple("World2", ["L", "ab", "aw", "ag", "R", "S", "sigma", "Ti", "gamma"],
+                    defaults=[1., 0.25, 0.75, 0.5, 0.2, 917., 5.67e-8, 22.5, 0.3])
+
+# dA/dt of the One-Daisy World
+def v(A, w):
+    ap = A * w.ai + (1 - A) * w.ag                                       # Planet Albedo
+    Te = (w.L * (w.S / w.sigma) * (1 - ap)) ** 0.25                      # Planet Temp
+    T = (w.R * w.L * (w.S / w.sigma) * (ap - w.ai) + (Te ** 4)) ** 0.25  # Daisy Temp
+    b = 1 - (0.003265 * ((273.15 + w.Ti) - T) ** 2)                      # Daisy Growth Rate
+    return A * ((1 - A) * b - w.gamma)
+
+# Partial derivatives (dv/dA, dv/dL) of the One-Daisy World
+def derivatives1d(A, w):
+    K = w.L * (w.S / w.sigma)
+    ap = A * w.ai + (1 - A) * w.ag
+    T = (w.R * K * (ap - w.ai) + K * (1 - ap)) ** 0.25
+    b = 1 - (0.003265 * ((273.15 + w.Ti) - T) ** 2)
+    db = 2 * 0.003265 * ((273.15 + w.Ti) - T) * K * (w.R - 1) / (4 * T ** 3)  # db/dap
+    dbdL = 2 * 0.003265 * ((273.15 + w.Ti) - T) * T / (4 * w.L)            # T ** 4 is proportional to L
+    dvdA = (1 - A) * b - w.gamma + A * (-b + (1 - A) * db * (w.ai - w.ag))
+    dvdL = A * (1 - A) * dbdL
+    return dvdA, dvdL
+
+# dA/dt of Black Daisy
+def vb(Ab, Aw, w):
+    ap = Aw * w.aw + Ab * w.ab + (1 - Aw - Ab) * w.ag                     # Planet Albedo
+    Te = (w.L * (w.S / w.sigma) * (1 - ap)) ** 0.25                       # Planet Temp
+    Tb = (w.R * w.L * (w.S / w.sigma) * (ap - w.ab) + (Te ** 4)) ** 0.25  # Black Daisy Temp
+    bb = 1 - (0.003265 * ((273.15 + w.Ti) - Tb) ** 2)                     # Black Daisy Growth Rate
+    return Ab * ((1 - Ab - Aw) * bb - w.gamma)
+
+# dA/dt of White Daisy
+def vw(Ab, Aw, w):
+    ap = Aw * w.aw + Ab * w.ab + (1 - Aw - Ab) * w.ag                     # Planet Albedo
+    Te = (w.L * (w.S / w.sigma) * (1 - ap)) ** 0.25                       # Planet Temp
+    Tw = (w.R * w.L * (w.S / w.sigma) * (ap - w.aw) + (Te ** 4)) ** 0.25  # White Daisy Temp
+    bw = 1 - (0.003265 * ((273.15 + w.Ti) - Tw) ** 2)                     # White Daisy Growth Rate
+    return Aw * ((1 - Aw - Ab) * bw - w.gamma)
+
+# (dAb/dt, dAw/dt) in one pass over the arrays Ab, Aw. The planet albedo is
+# shared, and both daisy temperatures are affine in it (Tb^4 = c * ap + cb), so
+# the parameter constants are computed once per record. out=(dAb, dAw) reuses
+# preallocated buffers; temperatures=True also returns Te, Tb, Tw in kelvin.
+# Like vb and vw, it accepts records whose fields are arrays (one value per
+# member of an ensemble), broadcast against Ab and Aw.
+def rates2d(Ab, Aw, w, out=None, temperatures=False):
+    c, cb, cw, K, T0 = _constants2d(w)
+    Ab, Aw = np.asarray(Ab, dtype=float), np.asarray(Aw, dtype=float)
+    shape = np.broadcast(Ab, Aw, *w).shape
+    dAb, dAw = out if out is not None else (np.empty(shape), np.empty(shape))
+    T = np.empty(shape)                         # work buffer shared by both species
+    ap = np.multiply(Ab, w.ab - w.ag, out=np.empty(shape))  # Planet Albedo
+    ap += Aw * (w.aw - w.ag)
+    ap += w.ag
+    free = np.subtract(1, Ab, out=np.empty(shape))
+    free -= Aw
+    Ts = []
+    for A, ci, dA in ((Ab, cb, dAb), (Aw, cw, dAw)):
+        np.multiply(ap, c, out=T)
+        T += ci
+        np.sqrt(T, out=T)
+        np.sqrt(T, out=T)                       # Daisy Temp
+        if temperatures:
+            Ts.append(T.copy())
+        np.subtract(T0, T, out=T)
+        np.square(T, out=T)
+        T *= -0.003265
+        T += 1                                  # Daisy Growth Rate
+        T *= free
+        T -= w.gamma
+        np.multiply(A, T, out=dA)
+    if temperatures:
+        Te = np.sqrt(np.sqrt(K * (1 - ap)))     # Planet Temp
+        return dAb, dAw, Te, Ts[0], Ts[1]
+    return dAb, dAw
+
+def _constants2d(w):
+    try:
+        return _cachedConstants2d(w)
+    except TypeError:  # fields that are arrays make the record unhashable
+        return _computeConstants2d(w)
+
+@lru_cache(maxsize=256)
+def _cachedConstants2d(w):
+    return _computeConstants2d(w)
+
+def _computeConstants2d(w):
+    K = w.L * (w.S / w.sigma)
+    return w.R * K - K, K - w.R * K * w.ab, K - w.R * K * w.aw, K, 273.15 + w.Ti
+
+# Jacobian [[dvb/dAb, dvb/dAw], [dvw/dAb, dvw/dAw]], returned as four arrays
+def jacobian2d(Ab, Aw, w):
+    K = w.L * (w.S / w.sigma)
+    ap = Aw * w.aw + Ab * w.ab + (1 - Aw - Ab) * w.ag
+    Te4 = K * (1 - ap)
+    Tb = (w.R * K * (ap - w.ab) + Te4) ** 0.25
+    Tw = (w.R * K * (ap - w.aw) + Te4) ** 0.25
+    bb = 1 - (0.003265 * ((273.15 + w.Ti) - Tb) ** 2)
+    bw = 1 - (0.003265 * ((273.15 + w.Ti) - Tw) ** 2)
+    # growth rates depend on the areas only through the planet albedo
+    dbb = 2 * 0.003265 * ((273.15 + w.Ti) - Tb) * K * (w.R - 1) / (4 * Tb ** 3)  # dbb/dap
+    dbw = 2 * 0.003265 * ((273.15 + w.Ti) - Tw) * K * (w.R - 1) / (4 * Tw ** 3)  # dbw/dap
+    free = 1 - Ab - Aw
+    j00 = free * bb - w.gamma + Ab * (-bb + free * dbb * (w.ab - w.ag))
+    j01 = Ab * (-bb + free * dbb * (w.aw - w.ag))
+    j10 = Aw * (-bw + free * dbw * (w.ab - w.ag))
+    j11 = free * bw - w.gamma + Aw * (-bw + free * dbw * (w.aw - w.ag))
+    return j00, j01, j10, j11
+
+# Partial derivatives (dvb/dL, dvw/dL) of the Two-Daisy World
+def dvdL2d(Ab, Aw, w):
+    K = w.L * (w.S / w.sigma)
+    ap = Aw * w.aw + Ab * w.ab + (1 - Aw - Ab) * w.ag
+    Tb = (w.R * K * (ap - w.ab) + K * (1 - ap)) ** 0.25
+    Tw = (w.R * K * (ap - w.aw) + K * (1 - ap)) ** 0.25
+    free = 1 - Ab - Aw
+    dvbdL = Ab * free * 2 * 0.003265 * ((273.15 + w.Ti) - Tb) * Tb / (4 * w.L)
+    dvwdL = Aw * free * 2 * 0.003265 * ((273.15 + w.Ti) - Tw) * Tw / (4 * w.L)
+    return dvbdL, dvwdL
@@ -0,0 +1,94 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import numpy as np
+import cache
+import equilibria
+import model
+import sweep
+
+# Regimes of a parameter plane, e.g. luminosity x death rate gamma. The regime
+# at a point is the number of stable and of unstable fixed points there, from
+# the {point: isStable} of equilibria.fixedPoints1d / fixedPoints2d. The plane
+# starts as an n-by-n grid of cells; a cell whose four corners share a regime is
+# a leaf, any other is split into four, down to depth levels of refinement, so
+# the equilibria are only searched for along the regime boundaries. Corners are
+# shared between neighbouring cells and evaluated once, one refinement level at
+# a time through sweep.run (progress is reported per level); workers > 1 starts a
+# process pool per level, which only pays off for large n or an expensive solver.
+# A regime that fits inside one cell without touching its corners is missed, so
+# n should resolve the smallest region of interest.
+#
+# Returns (cells, labels, regimes): the leaves as rows (x0, x1, y0, y1), the index
+# into regimes of each leaf (MIXED where the corners still disagree at the finest
+# level, i.e. on a boundary), and the regimes as rows (nStable, nUnstable). solver
+# holds keyword arguments for the fixed point search, e.g. {"nTestvec": 11}.
+#
+#   cells, labels, regimes = regimes.regimeMap(model.World1(), "L", (0.5, 1.8), "gamma", (0.1, 0.6))
+#   plt.imshow(regimes.raster(cells, labels, (0.5, 1.8), (0.1, 0.6)), origin="lower", extent=(0.5, 1.8, 0.1, 0.6))
+
+MIXED = -1
+
+@cache.persistent(ignore=("workers", "progress"))
+def regimeMap(world, x, xlim, y, ylim, n=8, depth=5, solver=None, workers=1, progress=None):
+    unknown = {x, y} - set(world._fields)
+    if unknown or x == y:
+        raise ValueError("Need two different parameters of {}, not {} and {}".format(type(world).__name__, x, y))
+    unit = 2 ** depth  # corners lie on a lattice with unit points per initial cell
+    def value(i, lim):
+        return lim[0] + (lim[1] - lim[0]) * i / (n * unit)
+    found = {}  # (i, j) on the lattice -> (nStable, nUnstable)
+    cells = [(i * unit, j * unit, unit) for j in range(n) for i in range(n)]
+    leaves = []
+    for level in range(depth + 1):
+        corners = sorted({c for cell in cells for c in _corners(cell)} - found.keys())
+        tasks = [(world, {x: value(i, xlim), y: value(j, ylim)}, solver or {}) for i, j in corners]
+        found.update(zip(corners, sweep.run(_regime, tasks, workers=workers, progress=progress)))
+        split = []
+        for cell in cells:
+            seen = {found[c] for c in _corners(cell)}
+            if len(seen) == 1:
+                leaves.append((cell, seen.pop()))
+            elif level == depth:
+                leaves.append((cell, None))
+            else:
+                i, j, size = cell
+                half = size // 2
+                split += [(i, j, half), (i + half, j, half), (i, j + half, half), (i + half, j + half, half)]
+        cells = split
+        if not cells:
+            break
+    regimes = sorted({r for _, r in leaves if r is not None})
+    index = {r: k for k, r in enumerate(regimes)}
+    bounds = np.array([(value(i, xlim), value(i + size, xlim), value(j, ylim), value(j + size, ylim))
+                       for (i, j, size), _ in leaves], dtype=float).reshape(-1, 4)
+    labels = np.array([MIXED if r is None else index[r] for _, r in leaves], dtype=int)
+    return bounds, labels, np.array(regimes, dtype=int).reshape(-1, 2)
+
+# Image of the regime labels on a grid of resolution cells per axis, rows along
+# y, for imshow(origin="lower", extent=(*xlim, *ylim))
+def raster(cells, labels, xlim, ylim, resolution=512):
+    image = np.full((resolution, resolution), MIXED, dtype=int)
+    def pixel(v, lim):
+        return int(round((v - lim[0]) / (lim[1] - lim[0]) * resolution))
+    for (x0, x1, y0, y1), label in zip(cells, labels):
+        image[pixel(y0, ylim):pixel(y1, ylim), pixel(x0, xlim):pixel(x1, xlim)] = label
+    return image
+
+def describe(regime):  # e.g. "2 stable, 1 unstable"
+    return "{} stable, {} unstable".format(*regime)
+
+def _corners(cell):
+    i, j, size = cell
+    return (i, j), (i + size, j), (i, j + size), (i + size, j + size)
+
+def _regime(task):
+    world, values, solver = task
+    w = world._replace(**values)
+    if isinstance(w, model.World1):
+        found = equilibria.fixedPoints1d(w, **solver)
+    else:
+        found = equilibria.fixedPoints2d(w, **solver)
+    stable = sum(found.values())
+    return stable, len(found) - stable
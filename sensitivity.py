@@ -0,0 +1,233 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+from collections import namedtuple
+import numpy as np
+import cache
+import ensemble
+import equilibria
+import integrate
+import model
+import sweep
+
+# Variance-based (Sobol) sensitivity of the equilibrium a world settles on to
+# its uncertain parameters. distributions maps k parameter names (model record
+# fields, or the initial areas A0 / Ab0 / Aw0) to ensemble.Uniform, Normal or
+# Choice; the other parameters come from world. Saltelli's scheme draws two
+# n-by-k matrices A and B from a scrambled Sobol sequence and evaluates the
+# model on A, on B and on every A with its i-th column taken from B, n * (k + 2)
+# evaluations in all. The first-order index of a parameter (Saltelli 2010) is
+# the share of the output variance it explains alone, the total-order index
+# (Jansen) the share it is involved in, interactions included. Confidence
+# intervals come from bootstrapping the n rows.
+#
+# The output of a member is the stable equilibrium reached from its initial
+# areas: its daisy cover and the planet temperature there, in degrees Celsius
+# like Ti. One-daisy equilibria are bracketed on a grid and bisected, two-daisy
+# ones are integrated with a step size per member and polished by Newton's
+# method, both for a whole batch of members at once. Batches run through
+# sweep.run, on a process pool when workers > 1, and the evaluations are kept in
+# the on-disk cache.
+#
+#   result = sensitivity.sobol1d(model.World1(), {"L": ensemble.Uniform(0.8, 1.2), "gamma": ensemble.Uniform(0.2, 0.4)})
+#   result["A"].first, result["A"].totalInterval
+
+Indices = namedtuple("Indices", ["parameters", "first", "firstInterval", "total", "totalInterval"])
+
+def sobol1d(world, distributions, n=1024, A0=0.5, seed=0, nBootstrap=1000, confidence=0.95,
+            batchsize=4096, workers=1, progress=None):
+    outputs = _outputs1d(world, distributions, n, A0, seed, batchsize=batchsize, workers=workers, progress=progress)
+    return _indices(outputs, sorted(distributions), nBootstrap, confidence, seed)
+
+def sobol2d(world, distributions, n=1024, Ab0=0.3, Aw0=0.4, seed=0, nBootstrap=1000, confidence=0.95,
+            batchsize=4096, workers=1, progress=None):
+    outputs = _outputs2d(world, distributions, n, Ab0, Aw0, seed, batchsize=batchsize, workers=workers, progress=progress)
+    return _indices(outputs, sorted(distributions), nBootstrap, confidence, seed)
+
+# The n-by-k base matrices A and B, columns in the order of sorted(distributions)
+def samples(distributions, n, seed=0):
+    from scipy.stats import qmc  # slow to import, and only needed here
+    names = sorted(distributions)
+    u = qmc.Sobol(2 * len(names), scramble=True, seed=np.random.default_rng(seed)).random(n)  # seed=, not rng=, for SciPy < 1.15
+    columns = [_inverse(distributions[name], u[:, i::len(names)]) for i, name in enumerate(names)]
+    values = np.stack(columns, axis=-1)
+    return values[:, 0], values[:, 1]
+
+# First- and total-order indices from the outputs f of shape (k + 2, n): f(A),
+# f(B), then f(A with column i from B) for every i. Returns (first, total), each
+# of shape (k,); a constant output has no variance to share and gives NaN.
+def indices(f):
+    return _estimates(f[0], f[1], f[2:])
+
+# Percentile bootstrap intervals of indices(f): (first, total), each of shape (k, 2)
+def bootstrap(f, nBootstrap=1000, confidence=0.95, seed=0):
+    rng = np.random.default_rng(seed)
+    k, n = len(f) - 2, f.shape[1]
+    first, total = np.empty((nBootstrap, k)), np.empty((nBootstrap, k))
+    step = max(1, 2 ** 23 // (n * (k + 2)))  # resamples per pass, bounding the memory
+    for start in range(0, nBootstrap, step):
+        rows = rng.integers(0, n, (min(step, nBootstrap - start), n))
+        resampled = f[:, rows]
+        first[start:start + len(rows)], total[start:start + len(rows)] = (e.T for e in _estimates(resampled[0], resampled[1], resampled[2:]))
+    q = 100 * np.array([(1 - confidence) / 2, (1 + confidence) / 2])
+    return np.nanpercentile(first, q, axis=0).T, np.nanpercentile(total, q, axis=0).T
+
+def _estimates(fA, fB, fAB):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.var(np.concatenate([fA, fB], axis=-1), axis=-1)
+        first = np.mean(fB * (fAB - fA), axis=-1) / variance
+        total = np.mean((fA - fAB) ** 2, axis=-1) / (2 * variance)
+    return first, total
+
+def _indices(outputs, names, nBootstrap, confidence, seed):
+    result = {}
+    for output, f in outputs.items():
+        f = np.asarray(f)
+        f = f[:, np.all(np.isfinite(f), axis=0)]  # rows with a member that never settled
+        first, total = indices(f)
+        firstInterval, totalInterval = bootstrap(f, nBootstrap, confidence, seed)
+        result[output] = Indices(names, first, firstInterval, total, totalInterval)
+    return result
+
+def _inverse(distribution, u):  # the values at the quantiles u of an ensemble distribution
+    if isinstance(distribution, ensemble.Uniform):
+        return distribution.lo + u * (distribution.hi - distribution.lo)
+    if isinstance(distribution, ensemble.Normal):
+        from scipy.special import ndtri
+        x = distribution.mean + distribution.sd * ndtri(np.clip(u, 1e-12, 1 - 1e-12))
+        return np.clip(x, distribution.lo, distribution.hi)
+    if isinstance(distribution, ensemble.Choice):
+        values = np.asarray(distribution.values, dtype=float)
+        return values[np.minimum((u * len(values)).astype(int), len(values) - 1)]
+    raise TypeError("Sobol indices need a distribution for every parameter, not {!r}; fix it in world instead".format(distribution))
+
+# All n * (k + 2) inputs, as rows: A, B, then A with column i from B for every i
+def _design(distributions, n, seed):
+    A, B = samples(distributions, n, seed)
+    mixed = []
+    for i in range(A.shape[1]):
+        ABi = A.copy()
+        ABi[:, i] = B[:, i]
+        mixed.append(ABi)
+    return np.concatenate([A, B] + mixed)
+
+def _evaluate(batch, world, distributions, n, seed, initial, batchsize, workers, progress):
+    unknown = set(distributions) - set(world._fields) - set(initial)
+    if unknown:
+        raise ValueError("Unknown parameters for {}: {}".format(type(world).__name__, ", ".join(sorted(unknown))))
+    X = _design(distributions, n, seed)
+    names = sorted(distributions)
+    chunks = [(world, names, X[i:i + batchsize], initial) for i in range(0, len(X), batchsize)]
+    results = sweep.run(batch, chunks, workers=workers, chunksize=1, progress=progress)
+    return {output: np.concatenate([r[output] for r in results]).reshape(len(names) + 2, n) for output in results[0]}
+
+@cache.persistent(ignore=("batchsize", "workers", "progress"))
+def _outputs1d(world, distributions, n, A0, seed, batchsize=4096, workers=1, progress=None):
+    return _evaluate(_batch1d, world, distributions, n, seed, {"A0": A0}, batchsize, workers, progress)
+
+@cache.persistent(ignore=("batchsize", "workers", "progress"))
+def _outputs2d(world, distributions, n, Ab0, Aw0, seed, batchsize=4096, workers=1, progress=None):
+    return _evaluate(_batch2d, world, distributions, n, seed, {"Ab0": Ab0, "Aw0": Aw0}, batchsize, workers, progress)
+
+def _members(chunk):  # the parameter record, with one value per member, and the initial areas
+    world, names, X, initial = chunk
+    values = dict(initial, **dict(zip(names, X.T)))
+    w = world._replace(**{f: values[f] for f in world._fields if f in values})
+    return w, {name: np.broadcast_to(np.asarray(values[name], dtype=float), len(X)) for name in initial}
+
+def _planetTemperature(ap, w):
+    return (w.L * (w.S / w.sigma) * (1 - ap)) ** 0.25 - 273.15
+
+def _batch1d(chunk):
+    w, initial = _members(chunk)
+    A = reached1d(w, initial["A0"])
+    return {"A": A, "T": _planetTemperature(A * w.ai + (1 - A) * w.ag, w)}
+
+def _batch2d(chunk):
+    w, initial = _members(chunk)
+    Ab, Aw = reached2d(w, initial["Ab0"], initial["Aw0"])
+    return {"Ab": Ab, "Aw": Aw, "T": _planetTemperature(Aw * w.aw + Ab * w.ab + (1 - Aw - Ab) * w.ag, w)}
+
+# The equilibrium reached from A0 by every member of w, a model.World1 record
+# whose fields may be arrays of the same length as A0. dA/dt keeps its sign
+# until the first root in the direction it points, so that root is bracketed on
+# an nGrid grid and bisected. A = 0 is always a root, and dA/dt < 0 at A = 1.
+def reached1d(w, A0, nGrid=101, nBisections=50):
+    A0 = np.asarray(A0, dtype=float)
+    with np.errstate(invalid="ignore"):
+        v0 = model.v(A0, w)
+        As = np.linspace(0, 1, nGrid)[:, None]
+        vs = model.v(As, w) * np.ones_like(A0)
+    if not (np.all(np.isfinite(v0)) and np.all(np.isfinite(vs))):
+        raise ValueError("Sampled parameters give non-finite rates; restrict the distributions to physical values")
+    up = v0 > 0
+    above = np.argmax((As > A0) & (vs <= 0), axis=0)  # first grid point above A0 where dA/dt <= 0
+    below = nGrid - 1 - np.argmax(((As < A0) & (vs >= 0))[::-1], axis=0)  # last one below A0 where dA/dt >= 0
+    outer = np.where(up, As[above, 0], As[below, 0])  # the side where the direction of dA/dt has flipped
+    inner = np.where(up, np.maximum(A0, As[np.maximum(above - 1, 0), 0]), np.minimum(A0, As[np.minimum(below + 1, nGrid - 1), 0]))
+    sign = np.where(up, 1., -1.)
+    for _ in range(nBisections):
+        middle = (inner + outer) / 2
+        moving = sign * model.v(middle, w) > 0
+        inner = np.where(moving, middle, inner)
+        outer = np.where(moving, outer, middle)
+    return np.where(v0 == 0, A0, outer)
+
+# The equilibrium reached from (Ab0, Aw0) by every member of w, a model.World2
+# record whose fields may be arrays. The members are integrated with their own
+# adaptive Dormand-Prince step sizes and drop out once both rates are below
+# steady (the accepted states only settle to within the error tolerance, so not
+# far below rtol) where the Jacobian is stable; Newton's method then polishes
+# them onto the fixed point as
+# long as that lowers the residual. Members still moving at tmax (e.g. on the
+# stable manifold of a saddle) give NaN.
+def reached2d(w, Ab0, Aw0, tmax=2000., steady=1e-5, rtol=1e-6, atol=1e-9, h0=0.1, maxSteps=100000, nNewton=6):
+    Ab0, Aw0 = np.broadcast_arrays(np.asarray(Ab0, dtype=float), np.asarray(Aw0, dtype=float))
+    arrays = [f for f in w._fields if np.ndim(getattr(w, f))]
+    def f(y, members):
+        wi = w._replace(**{name: getattr(w, name)[members] for name in arrays})
+        return np.array([model.vb(y[0], y[1], wi), model.vw(y[0], y[1], wi)])
+    y = np.array([Ab0, Aw0]).reshape(2, -1)
+    with np.errstate(invalid="ignore"):
+        k = f(y, np.arange(y.shape[1]))
+    if not np.all(np.isfinite(k)):
+        raise ValueError("Sampled parameters give non-finite rates; restrict the distributions to physical values")
+    final = np.full(y.shape, np.nan)
+    members = np.arange(y.shape[1])  # the members still being integrated
+    t = np.zeros(y.shape[1])
+    h = np.full(y.shape[1], h0)
+    for _ in range(maxSteps):
+        settled = np.max(np.abs(k), axis=0) < steady
+        if settled.any():  # slow, not settled, when passing a saddle (e.g. a species about to invade)
+            wi = w._replace(**{name: getattr(w, name)[members[settled]] for name in arrays})
+            _, kinds = equilibria.stability2d(y[0, settled], y[1, settled], wi)
+            settled[settled] = equilibria.isStable(kinds)
+        final[:, members[settled]] = y[:, settled]
+        keep = ~settled & (t < tmax)
+        members, y, k, t, h = members[keep], y[:, keep], k[:, keep], t[keep], h[keep]
+        if not len(members):
+            break
+        h = np.minimum(h, tmax - t)
+        with np.errstate(invalid="ignore", over="ignore"):
+            yNew, kNew, err = integrate.step54(lambda y: f(y, members), y, k, h)
+            scale = atol + rtol * np.maximum(np.abs(y), np.abs(yNew))
+            error = np.max(np.abs(err) / scale, axis=0)
+        accept = error <= 1
+        y[:, accept], k[:, accept] = yNew[:, accept], kNew[:, accept]
+        t[accept] += h[accept]
+        with np.errstate(divide="ignore"):
+            h *= np.where(np.isfinite(error), np.clip(0.9 * error ** -0.2, 0.2, 5), 0.2)
+    Ab, Aw = final
+    everyone = np.arange(len(Ab))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(nNewton):
+            fb, fw = f(np.array([Ab, Aw]), everyone)
+            j00, j01, j10, j11 = model.jacobian2d(Ab, Aw, w)
+            det = j00 * j11 - j01 * j10
+            nb = Ab - (j11 * fb - j01 * fw) / det
+            nw = Aw - (-j10 * fb + j00 * fw) / det
+            fnb, fnw = f(np.array([nb, nw]), everyone)
+            better = (fnb ** 2 + fnw ** 2 < fb ** 2 + fw ** 2) & (np.abs(nb - Ab) + np.abs(nw - Aw) < 1e-2)
+            Ab, Aw = np.where(better, nb, Ab), np.where(better, nw, Aw)
+    return Ab.reshape(np.shape(Ab0)), Aw.reshape(np.shape(Aw0))
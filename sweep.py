@@ -0,0 +1,118 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+import cache
+import equilibria
+
+# Parameter sweeps on a process pool. run() evaluates func at every point, in
+# chunks of chunksize points per task, and returns the results in the order of
+# points. func must be picklable (defined at the top level of a module), and
+# scripts that call run() need an `if __name__ == "__main__":` guard on platforms
+# that spawn worker processes. progress(done, total) is called as chunks finish.
+
+def run(func, points, workers=None, chunksize=None, progress=None):
+    points = list(points)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(points) <= 1:
+        results = []
+        for p in points:
+            results.append(func(p))
+            if progress is not None:
+                progress(len(results), len(points))
+        return results
+    chunksize = chunksize or max(1, len(points) // (4 * workers))
+    results = [None] * len(points)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for start in range(0, len(points), chunksize):
+            chunk = points[start:start + chunksize]
+            futures[executor.submit(_runChunk, func, chunk)] = start
+        for future in as_completed(futures):
+            chunk = future.result()
+            start = futures[future]
+            results[start:start + len(chunk)] = chunk
+            done += len(chunk)
+            if progress is not None:
+                progress(done, len(points))
+    return results
+
+# Like run(), but yields the results one at a time as they finish, in any order,
+# and keeps at most 2 * workers points in flight, so that results can be reduced
+# as they arrive (e.g. into running statistics) without holding them all.
+# points may be a generator, so the number of points, if known, is passed as
+# total for progress(done, total).
+
+def stream(func, points, workers=None, progress=None, total=None):
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    if workers == 1:
+        for p in points:
+            yield func(p)
+            done += 1
+            if progress is not None:
+                progress(done, total)
+        return
+    points = iter(points)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        while True:
+            for p in points:
+                pending.add(executor.submit(func, p))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                return
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+
+def printProgress(done, total):
+    sys.stderr.write("\r{}/{} ({:.0%})".format(done, total, done / total))
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+# Equilibria {A: stable} (1D) or {(Ab, Aw): stable} (2D) of a model.World1 /
+# model.World2 record at every luminosity in Ls. Results are shared with the
+# memo of equilibria.fixedPoints1d / fixedPoints2d: luminosities solved before
+# in this process are not sent to the workers again, and whole sweeps are kept in
+# the on-disk cache for later sessions.
+
+@cache.persistent(version=1, ignore=("workers", "chunksize", "progress"))
+def equilibria1d(world, Ls, workers=None, chunksize=None, progress=None, **kwargs):
+    points = [(world._replace(L=L), kwargs) for L in Ls]
+    return _runCached(equilibria.fixedPoints1d, _equilibrium1d, points, workers, chunksize, progress)
+
+@cache.persistent(ignore=("workers", "chunksize", "progress"))
+def equilibria2d(world, Ls, workers=None, chunksize=None, progress=None, **kwargs):
+    points = [(world._replace(L=L), kwargs) for L in Ls]
+    return _runCached(equilibria.fixedPoints2d, _equilibrium2d, points, workers, chunksize, progress)
+
+def _runChunk(func, chunk):
+    return [func(p) for p in chunk]
+
+def _runCached(memoized, func, points, workers, chunksize, progress):
+    missing = object()
+    keys = [memoized.key(w, **kwargs) for w, kwargs in points]
+    results = [memoized.cache.lookup(k, missing) for k in keys]
+    todo = [i for i, r in enumerate(results) if r is missing]
+    for i, r in zip(todo, run(func, [points[i] for i in todo], workers, chunksize, progress)):
+        memoized.cache.store(keys[i], r)
+        results[i] = r
+    return [dict(r) for r in results]
+
+def _equilibrium1d(point):  # solves without the memo, which would not outlive a worker process
+    w, kwargs = point
+    return equilibria.fixedPoints1d.__wrapped__(w, **kwargs)
+
+def _equilibrium2d(point):
+    w, kwargs = point
+    return equilibria.fixedPoints2d.__wrapped__(w, **kwargs)
@@ -0,0 +1,26 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import numpy as np
+import daisyworldCLI
+
+# Adaptive trajectories run past t = 10 must agree with Forward-Euler ones,
+# rather than hold the areas reached at the integrator's default tmax.
+
+def test_trajectory_long_tmax_1d(tmp_path):
+    adaptive, euler = tmp_path / "adaptive.npz", tmp_path / "euler.npz"
+    daisyworldCLI.main(["trajectory", "--A0", "0.001", "--tmax", "40", "--dt", "5", "-o", str(adaptive)])
+    daisyworldCLI.main(["trajectory", "--A0", "0.001", "--tmax", "40", "--dt", "0.001", "--method", "euler", "-o", str(euler)])
+    a, e = np.load(adaptive), np.load(euler)
+    assert a["t"][-1] == 35
+    assert np.allclose(a["A0"], np.interp(a["t"], e["t"], e["A0"]), atol=2e-3)
+
+def test_trajectory_long_tmax_2d(tmp_path):
+    adaptive, euler = tmp_path / "adaptive.npz", tmp_path / "euler.npz"
+    flags = ["trajectory", "--model", "2", "--Ab0", "0.01", "--Aw0", "0.01", "--tmax", "40"]
+    daisyworldCLI.main(flags + ["--dt", "5", "-o", str(adaptive)])
+    daisyworldCLI.main(flags + ["--dt", "0.001", "--method", "euler", "-o", str(euler)])
+    a, e = np.load(adaptive), np.load(euler)
+    for name in ("Ab0", "Aw0"):
+        assert np.allclose(a[name], np.interp(a["t"], e["t"], e[name]), atol=2e-3)
@@ -0,0 +1,47 @@
+# This file is part of the Daisyworld project <https://github.com/nus-sps/earth-daisyworld-article>
+# The project is licensed under the terms of GPL-3.0-or-later. <https://www.gnu.org/licenses/>
+# Author: Kun Hee Park
+
+import numpy as np
+import ensemble
+import integrate
+import model
+
+# An unbounded distribution on the initial areas draws members outside 0..1,
+# whose rates are not finite; they must be clipped, not stall the batch.
+
+def test_unbounded_A0():
+    times = np.linspace(0, 50, 11)
+    stats = ensemble.ensemble1d(model.World1(), {"A0": ensemble.Normal(0.5, 0.3)}, 1000, times, batchsize=250, workers=1)
+    A = stats["A"]
+    assert A.count == 1000
+    assert np.all(np.isfinite(A.mean)) and np.all((A.mean >= 0) & (A.mean <= 1))
+    assert np.all((A.surviving() >= 0) & (A.surviving() <= 1))
+
+def test_unbounded_Ab0_Aw0():
+    times = np.linspace(0, 50, 11)
+    stats = ensemble.ensemble2d(model.World2(), {"Ab0": ensemble.Normal(0.5, 0.4), "Aw0": ensemble.Normal(0.5, 0.4)},
+                                400, times, batchsize=200, workers=1)
+    for name in ("Ab", "Aw"):
+        assert stats[name].count == 400
+        assert np.all(np.isfinite(stats[name].mean))
+    assert np.all(stats["Ab"].mean + stats["Aw"].mean <= 1 + 1e-9)
+
+# Past the integrator's default tmax the members must keep evolving: identical
+# members give the mean of a single fine Forward-Euler trajectory.
+
+def test_long_horizon_1d():
+    times = np.linspace(0, 50, 11)
+    world = model.World1(L=1.0)
+    stats = ensemble.ensemble1d(world, {}, 100, times, A0=1e-3, batchsize=50, workers=1)
+    time, areas = integrate.euler1d(lambda A: model.v(A, world), 1e-3, dt=1e-3, tmax=50 + 1e-3)
+    assert np.allclose(stats["A"].mean, np.interp(times, time, areas), atol=2e-3)
+
+def test_long_horizon_2d():
+    times = np.linspace(0, 50, 11)
+    world = model.World2(L=1.0)
+    stats = ensemble.ensemble2d(world, {}, 100, times, Ab0=0.01, Aw0=0.01, batchsize=50, workers=1)
+    time, black, white = integrate.euler2d(lambda Ab, Aw: model.vb(Ab, Aw, world), lambda Ab, Aw: model.vw(Ab, Aw, world),
+                                           0.01, 0.01, dt=1e-3, tmax=50 + 1e-3)
+    assert np.allclose(stats["Ab"].mean, np.interp(times, time, black), atol=2e-3)
+    assert np.allclose(stats["Aw"].mean, np.interp(times, time, white), atol=2e-3)
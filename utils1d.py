@@ -6,22 +6,11 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import matplotlib.lines as mlines
-from scipy.optimize import minimize
+import equilibria
+import history
 
-def equilibrium(v, nTestvec=21, dA=1e-5, ctol=1e-7, xtol=1e-7):
-    def _cost(A):
-        return v(A) ** 2
-    def _stability(A):
-        return (v(A + dA) - v(A - dA) < 0)
-    fixedPoints = {}
-    testvec = np.linspace(0, 1, num=nTestvec)
-    for A0 in testvec:
-        res = minimize(_cost, A0, method="nelder-mead", options={"xtol": xtol})
-        p = round(res.x[0], 5)
-        if (p not in fixedPoints.keys()) and (0 <= p <= 1) and (_cost(p) < ctol):
-            isStable = _stability(p)
-            fixedPoints[p] = isStable
-    return fixedPoints
+def equilibrium(v, nTestvec=101, dA=1e-5, ctol=1e-7, xtol=1e-12, derivative=None):
+    return equilibria.equilibrium1d(v, nGrid=nTestvec, dA=dA, ctol=ctol, xtol=xtol, derivative=derivative)
 
 def plot_time_iteration(x, y, ax=None, plot=True):
     ax = ax or plt.gca()
@@ -64,9 +53,15 @@ def plot_together(t_data, s_data, fixedPoints=None):
     plot_state_space(sx, sy, fixedPoints, ax2)
     traj1, = ax1.plot(tx[0], ty[0], '.', color='#ff8080')
     traj2, = ax2.plot(ty[0], tv[0], '.', color='#ff8080')
+    h1, h2 = history.History(2), history.History(2)  # bounded, decimated copies of tx[:i]
     def _update(i, traj1, traj2):
-        traj1.set_data(tx[:i], ty[:i])
-        traj2.set_data(ty[:i], tv[:i])
+        if i < len(h1):  # the animation restarted
+            h1.clear()
+            h2.clear()
+        h1.append(tx[len(h1):i], ty[len(h1):i])
+        h2.append(ty[len(h2):i], tv[len(h2):i])
+        traj1.set_data(*h1.vertices())
+        traj2.set_data(*h2.vertices())
         return traj1, traj2,
     ani = animation.FuncAnimation(fig, _update, len(tx), fargs=[traj1, traj2],
                                   interval=50 / len(tx), blit=True, repeat=False)
@@ -87,4 +82,40 @@ def plot_bifurcation(x, y, ax=None):
         for k in y[i].keys():
             _l0, = ax.plot(k, x[i], "b^" if y[i][k] else "rv", clip_on=False)
             l0.append(_l0)
-    return l0,
\ No newline at end of file
+    return l0,
+
+def plot_branches(branches, ax=None):
+    ax = ax or plt.gca()
+    ax.set_xlim(0, 1)
+    ax.set_ylim(min(b[0].min() for b in branches), max(b[0].max() for b in branches))
+    ax.set_xlabel('Daisy Area ($A$)')
+    ax.set_ylabel('Luminosity ($L$)')
+    ax.legend(handles=[
+        mlines.Line2D([], [], color='b', linestyle='-', label='Stable'),
+        mlines.Line2D([], [], color='r', linestyle='--', label='Unstable')
+    ])
+    l0 = []
+    for L, A, stable in branches:
+        for mask, style in ((stable, 'b-'), (~stable, 'r--')):
+            mask = mask | np.append(False, mask[:-1])  # one extra point joins the pieces up
+            _l0, = ax.plot(np.where(mask, A, np.nan), L, style, clip_on=False)
+            l0.append(_l0)
+    return l0,
+
+def plot_fold_curves(curves, cusps=(), parameter='p', ax=None):  # from continuation.foldCurves1d/2d and cusps1d/2d
+    ax = ax or plt.gca()
+    ax.set_xlabel('Luminosity ($L$)')
+    ax.set_ylabel(parameter)
+    ax.legend(handles=[
+        mlines.Line2D([], [], color='k', linestyle='-', label='Fold'),
+        mlines.Line2D([], [], color='g', linestyle='--', label='Transcritical'),
+        mlines.Line2D([], [], color='m', marker='o', linestyle='None', label='Codimension two')
+    ])
+    l0 = []
+    for c in curves:
+        _l0, = ax.plot(c[0], c[1], 'k-' if c[-1] == 'fold' else 'g--')
+        l0.append(_l0)
+    for c in cusps:
+        _l0, = ax.plot(c[0], c[1], 'mo')
+        l0.append(_l0)
+    return l0,
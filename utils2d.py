@@ -6,27 +6,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import matplotlib.lines as mlines
+import matplotlib.patches as mpatches
 from mpl_toolkits.mplot3d import Axes3D
 from scipy.optimize import minimize
-from scipy.misc import derivative
+import basins
+import equilibria
+import history
 
-def equilibrium(vb, vw, nTestvec=21, dA=1e-5, ctol=1e-7, xtol=1e-7):
+def equilibrium(vb, vw, nTestvec=21, dA=1e-5, ctol=1e-7, xtol=1e-7, jacobian=None):
+    if jacobian is not None:  # closed-form Jacobian given: batched Newton from every seed
+        return equilibria.equilibrium2d(vb, vw, jacobian, nTestvec=nTestvec, ctol=ctol)
     def _cost(A):
         return vb(A[0], A[1]) ** 2 + vw(A[0], A[1]) ** 2
-    def _derivative(v, coords, idx):
-        args = coords[:]
-        def wraps(x):
-            args[idx] = x
-            return v(*args)
-        return derivative(wraps, coords[idx], dx=dA)
-    def _JacobianStability(p):
-        j00 = _derivative(vb, p, 0)
-        j01 = _derivative(vb, p, 1)
-        j10 = _derivative(vw, p, 0)
-        j11 = _derivative(vw, p, 1)
-        jacobian = np.array([[j00, j01], [j10, j11]])
-        eigval, _ = np.linalg.eig(jacobian)
-        return (eigval[0] < 0 and eigval[1] < 0)
     fixedPoints = {}
     testvec = np.linspace(0, 1, num=nTestvec)
     for Ab0 in testvec:
@@ -37,8 +28,15 @@ def equilibrium(vb, vw, nTestvec=21, dA=1e-5, ctol=1e-7, xtol=1e-7):
                     pb = round(res.x[0], 5)
                     pw = round(res.x[1], 5)
                     if ((pb, pw) not in fixedPoints.keys()) and ((pb + pw) <= 1) and (pb >= 0) and (pw >= 0) and (_cost([pb, pw]) < ctol):
-                        isStable = _JacobianStability([pb, pw])
-                        fixedPoints[(pb, pw)] = isStable
+                        fixedPoints[(pb, pw)] = None
+    if fixedPoints:  # central differences of width 2 * dA, for all fixed points at once
+        Ab, Aw = np.array(list(fixedPoints.keys())).T
+        j00 = (vb(Ab + dA, Aw) - vb(Ab - dA, Aw)) / (2 * dA)
+        j01 = (vb(Ab, Aw + dA) - vb(Ab, Aw - dA)) / (2 * dA)
+        j10 = (vw(Ab + dA, Aw) - vw(Ab - dA, Aw)) / (2 * dA)
+        j11 = (vw(Ab, Aw + dA) - vw(Ab, Aw - dA)) / (2 * dA)
+        _, kinds = equilibria.classify2d(j00, j01, j10, j11)
+        fixedPoints = dict(zip(fixedPoints.keys(), equilibria.isStable(kinds).tolist()))
     return fixedPoints
 
 def plot_time_iteration(x, yb, yw, ax=None, plot=True):
@@ -80,6 +78,18 @@ def plot_state_space(xb, xw, yb, yw, fixedPoints=None, ax=None):
             l1.append(_l1)
     return l0, l1
 
+def plot_basins(ab, aw, labels, attractors, ax=None, alpha=0.35):
+    ax = ax or plt.gca()
+    xlim, ylim = ax.get_xlim(), ax.get_ylim()
+    l0 = ax.imshow(basins.image(labels, alpha), origin='lower', extent=basins.extent(ab, aw), interpolation='nearest',
+                   aspect=ax.get_aspect(), zorder=0)
+    ax.set_xlim(*xlim)
+    ax.set_ylim(*ylim)
+    handles = [mpatches.Patch(color=basins.PALETTE[i % len(basins.PALETTE)] + (alpha,),
+                              label='Basin of ({:.2f}, {:.2f})'.format(*p)) for i, p in enumerate(attractors)]
+    ax.legend(handles=handles, loc=1)
+    return l0, handles
+
 def plot_together(t_data, s_data, fixedPoints=None):
     tx, tyb, tyw = t_data
     sxb, sxw, syb, syw = s_data
@@ -91,10 +101,19 @@ def plot_together(t_data, s_data, fixedPoints=None):
     traj1b, = ax1.plot(tx[0], tyb[0], '.', color='#ff00c0')
     traj1w, = ax1.plot(tx[0], tyw[0], '.', color='#ffc000')
     traj2, = ax2.plot(tyb[0], tyw[0], '.', color='#ff8080')
+    hb, hw, h2 = history.History(2), history.History(2), history.History(2)  # bounded, decimated copies of tx[:i]
     def _update(i, traj1b, traj1w, traj2):
-        traj1b.set_data(tx[:i], tyb[:i])
-        traj1w.set_data(tx[:i], tyw[:i])
-        traj2.set_data(tyb[:i], tyw[:i])
+        if i < len(hb):  # the animation restarted
+            hb.clear()
+            hw.clear()
+            h2.clear()
+        n = len(hb)
+        hb.append(tx[n:i], tyb[n:i])
+        hw.append(tx[n:i], tyw[n:i])
+        h2.append(tyb[n:i], tyw[n:i])
+        traj1b.set_data(*hb.vertices())
+        traj1w.set_data(*hw.vertices())
+        traj2.set_data(*h2.vertices())
         return traj1b, traj1w, traj2,
     ani = animation.FuncAnimation(fig, _update, len(tx), fargs=[traj1b, traj1w, traj2],
                                   interval=50 / len(tx), blit=True, repeat=False)
@@ -118,4 +137,25 @@ def plot_bifurcation(x, y, ax=None):
         for k in y[i].keys():
             _ls, = ax.plot(k[0], k[1], x[i], "b^" if y[i][k] else "rv", clip_on=False)
             ls.append(_ls)
-    return ls
\ No newline at end of file
+    return ls
+
+def plot_branches(branches, ax=None):
+    if ax is None:
+        _, ax = plt.subplots(subplot_kw=dict(projection="3d"))
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.set_zlim(min(b[0].min() for b in branches), max(b[0].max() for b in branches))
+    ax.set_xlabel("Black Daisy Area ($A_b$)")
+    ax.set_ylabel("White Daisy Area ($A_w$)")
+    ax.set_zlabel("Luminosity ($L$)")
+    ax.legend(handles=[
+        mlines.Line2D([], [], color='b', linestyle='-', label='Stable'),
+        mlines.Line2D([], [], color='r', linestyle='--', label='Unstable')
+    ])
+    ls = []
+    for L, Ab, Aw, stable in branches:
+        for mask, style in ((stable, 'b-'), (~stable, 'r--')):
+            mask = mask | np.append(False, mask[:-1])  # one extra point joins the pieces up
+            _ls, = ax.plot(np.where(mask, Ab, np.nan), np.where(mask, Aw, np.nan), L, style)
+            ls.append(_ls)
+    return ls